@@ -0,0 +1,92 @@
+"""
+Worker-side helpers for ArraySumLab's process and interpreter pools
+
+Workers receive only a shared memory block name and (start, end) index
+ranges, map the block once in attach(), and sum views of it. The streaming
+file reducers instead map one chunk of a file at a time. This module
+imports nothing outside the standard library at load time, so it can also
+be imported inside subinterpreters, which cannot load most extension
+modules (numpy is only imported inside the functions that need it).
+"""
+
+import mmap
+import sys
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_block: Optional[shared_memory.SharedMemory] = None
+_view = None  # int64 view of the whole block: numpy array or memoryview
+
+def attach(name: str, size: int, vectorized: bool):
+    """Pool initializer: map the parent's int64 array without copying it."""
+    global _block, _view
+    try:
+        # Python 3.13+: the parent owns the block, so don't track it here
+        _block = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        _block = shared_memory.SharedMemory(name=name)
+
+    if vectorized:
+        import numpy as np
+        _view = np.ndarray((size,), dtype=np.int64, buffer=_block.buf)
+    else:
+        _view = _block.buf.cast('q')[:size]
+
+def sum_range(start_idx: int, end_idx: int) -> int:
+    """Sum one chunk; slicing either view type never copies."""
+    chunk = _view[start_idx:end_idx]
+    if hasattr(chunk, 'sum'):
+        return int(chunk.sum())
+    return sum(chunk)
+
+def _reduce_values(values, reducer: str, bins: int, value_range: Tuple[int, int]):
+    if reducer == "sum":
+        return int(values.sum(dtype='int64'))  # int32 would overflow
+    if reducer == "min":
+        return int(values.min())
+    if reducer == "max":
+        return int(values.max())
+    if reducer == "histogram":
+        import numpy as np
+        return np.histogram(values, bins=bins, range=value_range)[0]
+    raise ValueError(f"Unknown reducer: {reducer}")
+
+def combine(reducer: str, first, second):
+    """Merge two partial results of the same reducer."""
+    if reducer == "min":
+        return min(first, second)
+    if reducer == "max":
+        return max(first, second)
+    return first + second  # sum and histogram counts both add
+
+def load_numpy():
+    """Pool initializer for the streaming reducers: pay for the import up front."""
+    import numpy  # noqa: F401
+
+def reduce_file_chunk(path: str, offset: int, length: int, reducer: str,
+                      bins: int = 10, value_range: Tuple[int, int] = (1, 101)):
+    """Map one chunk of an int32 file, reduce it, unmap it again.
+    
+    Unmapping after every chunk is what keeps RSS flat: pages of a mapping
+    that stays open count towards RSS until the whole file has been read.
+    Returns (partial result, this worker's peak RSS in bytes).
+    """
+    import numpy as np
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), length, offset=offset,
+                                          access=mmap.ACCESS_READ) as mapped:
+        values = np.frombuffer(mapped, dtype=np.int32)
+        partial = _reduce_values(values, reducer, bins, value_range)
+        del values  # release the buffer before the mapping closes
+    return partial, peak_rss_bytes()
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process (0 where unsupported)."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # Linux reports KB
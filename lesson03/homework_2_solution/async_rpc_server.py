@@ -0,0 +1,216 @@
+import asyncio
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+
+from rpc_codecs import JSON_CODEC
+from rpc_framing import HEADER, FrameError, MAX_FRAME_SIZE, encode_frame
+from rpc_server import RPCServer
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+class AsyncRPCServer(RPCServer):
+    """JSON-RPC server on one asyncio event loop instead of a thread per client
+
+    Same register_method API and calculator methods as RPCServer. Handlers
+    may be `async def` functions, which run on the loop; plain functions run
+    in a bounded thread pool so a slow one can't stall other clients
+    (executor_workers=0 runs them inline instead, for handlers known to be
+    fast, like the calculator's).
+
+    Limits:
+    - max_connections: clients beyond this get an error frame and are closed
+    - max_pending: pipelined requests in flight per connection; the server
+      stops reading from a client that is this far ahead, so TCP flow control
+      pushes back on it instead of requests piling up in memory
+    """
+
+    def __init__(self, host='localhost', port=8888, max_connections=10000,
+                 max_pending=64, executor_workers=8, backlog=4096, use_uvloop=True, codecs=None):
+        super().__init__(host, port, codecs=codecs)
+        self.max_connections = max_connections
+        self.max_pending = max_pending
+        self.backlog = backlog
+        self.use_uvloop = use_uvloop
+        self.executor = ThreadPoolExecutor(max_workers=executor_workers) if executor_workers else None
+        self.connections = 0
+        self.rejected = 0
+        self.requests_handled = 0
+        self.server = None
+
+    async def call_method(self, method, params):
+        """Await async handlers, run sync ones in the bounded executor"""
+        handler = self.methods[method]
+        if inspect.iscoroutinefunction(handler):
+            return await handler(*params)
+        if self.executor is None:
+            return handler(*params)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, lambda: handler(*params))
+
+    async def dispatch_async(self, request):
+        """Run one request object; returns None for a notification (no id)"""
+        if not isinstance(request, dict):
+            return {
+                "jsonrpc": "2.0",
+                "error": "Invalid Request",
+                "id": None
+            }
+
+        is_notification = "id" not in request
+        try:
+            method = request.get("method")
+            request_id = request.get("id")
+            if method not in self.methods:
+                response = {
+                    "jsonrpc": "2.0",
+                    "error": f"Method '{method}' not found",
+                    "id": request_id
+                }
+            else:
+                try:
+                    result = await self.call_method(method, request.get("params", []))
+                    response = {
+                        "jsonrpc": "2.0",
+                        "result": result,
+                        "id": request_id
+                    }
+                except Exception as e:
+                    response = {
+                        "jsonrpc": "2.0",
+                        "error": str(e),
+                        "id": request_id
+                    }
+        
+        except Exception as e:
+            # e.g. an unhashable method name, as in RPCServer.dispatch
+            response = {
+                "jsonrpc": "2.0",
+                "error": str(e),
+                "id": None
+            }
+        self.requests_handled += 1
+        return None if is_notification else response
+
+    async def handle_request_async(self, data, codec=JSON_CODEC):
+        """Async counterpart of RPCServer.handle_request (batches run concurrently)"""
+        try:
+            request = codec.decode(data)
+        except ValueError:
+            return {
+                "jsonrpc": "2.0",
+                "error": f"Invalid {codec.label} format",
+                "id": None
+            }
+
+        if not isinstance(request, list):
+            return await self.dispatch_async(request)
+        if not request:
+            return {
+                "jsonrpc": "2.0",
+                "error": "Invalid Request: empty batch",
+                "id": None
+            }
+        responses = await asyncio.gather(*(self.dispatch_async(item) for item in request))
+        responses = [response for response in responses if response is not None]
+        return responses or None
+
+    async def _respond(self, frame, writer, pending, codec):
+        try:
+            try:
+                response = await self.handle_request_async(frame, codec)
+                payload = None if response is None else codec.encode(response)
+            except Exception as e:
+                # Never let the task die silently: the client would wait forever
+                response = {
+                    "jsonrpc": "2.0",
+                    "error": f"Internal error: {e}",
+                    "id": None
+                }
+                payload = JSON_CODEC.encode(response)
+            if payload is not None and not writer.is_closing():
+                writer.write(encode_frame(payload))
+                await writer.drain()  # wait here if the client reads slowly
+        except ConnectionError:
+            pass
+        finally:
+            pending.release()
+
+    async def handle_connection(self, reader, writer):
+        if self.connections >= self.max_connections:
+            self.rejected += 1
+            writer.write(encode_frame(JSON_CODEC.encode({
+                "jsonrpc": "2.0",
+                "error": "Server busy: too many connections",
+                "id": None
+            })))
+            writer.close()
+            return
+
+        self.connections += 1
+        pending = asyncio.Semaphore(self.max_pending)
+        tasks = set()
+        codec = JSON_CODEC
+        first_frame = True
+        try:
+            while True:
+                await pending.acquire()  # backpressure: stop reading when too far ahead
+                try:
+                    header = await reader.readexactly(HEADER.size)
+                    (length,) = HEADER.unpack(header)
+                    if length > MAX_FRAME_SIZE:
+                        raise FrameError(f"Frame of {length} bytes exceeds {MAX_FRAME_SIZE}")
+                    frame = await reader.readexactly(length)
+                except (asyncio.IncompleteReadError, ConnectionError, FrameError):
+                    pending.release()
+                    break
+
+                if first_frame:
+                    first_frame = False
+                    negotiated = self.negotiate(frame)
+                    if negotiated is not None:
+                        # Answered in JSON before any later frame is read
+                        codec, response = negotiated
+                        writer.write(encode_frame(JSON_CODEC.encode(response)))
+                        pending.release()
+                        continue
+
+                # Requests on one connection run concurrently; clients match by id
+                task = asyncio.create_task(self._respond(frame, writer, pending, codec))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def serve(self, ready=None):
+        """Listen until cancelled; sets the `ready` event once accepting"""
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port,
+                                                 backlog=self.backlog)
+        print(f"Async JSON-RPC Server listening on {self.host}:{self.port}"
+              f"{' (uvloop)' if self.use_uvloop and uvloop else ''}")
+        if ready is not None:
+            ready.set()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def start(self):
+        """Start the RPC server (blocks, like RPCServer.start)"""
+        loop_factory = uvloop.new_event_loop if self.use_uvloop and uvloop else None
+        try:
+            with asyncio.Runner(loop_factory=loop_factory) as runner:
+                runner.run(self.serve())
+        except KeyboardInterrupt:
+            print("\nServer shutting down...")
+        finally:
+            if self.executor:
+                self.executor.shutdown(wait=False)
+
+if __name__ == "__main__":
+    server = AsyncRPCServer()
+    server.start()
@@ -1,15 +1,34 @@
 import socket
-import json
+from collections import deque
+from contextlib import contextmanager
+from rpc_framing import FrameDecoder, encode_frame, recv_frames
+from rpc_codecs import JSON_CODEC, NEGOTIATE_METHOD, get_codec
+
+# Calculator methods the server exposes; attribute proxies (RPCBatch,
+# RPCClientPool) forward only these, never client plumbing like close()
+CALCULATOR_METHODS = frozenset(
+    {'add', 'subtract', 'multiply', 'divide', 'power', 'square_root', 'modulo'})
 
 class RemoteCalculator:
-    """Proxy object that makes remote calls look like local method calls"""
+    """Proxy object that makes remote calls look like local method calls
+    
+    codec picks the wire format ('json', 'msgpack' or 'struct'); anything
+    but JSON is negotiated with the server when connecting, and the client
+    stays on JSON if the server doesn't offer it.
+    """
     
-    def __init__(self, host='localhost', port=8888):
+    def __init__(self, host='localhost', port=8888, codec='json'):
         self.host = host
         self.port = port
         self.socket = None
         self.request_id = 0
+        self.decoder = FrameDecoder()
+        self.responses = {}  # id -> response that arrived before it was asked for
+        self.batch_replies = deque()  # batch replies read but not yet collected
+        self.codec = JSON_CODEC
         self.connect()
+        if codec != JSON_CODEC.name:
+            self.negotiate([get_codec(codec).name, JSON_CODEC.name])
     
     def connect(self):
         """Connect to the RPC server"""
@@ -17,8 +36,14 @@ class RemoteCalculator:
         self.socket.connect((self.host, self.port))
         print(f"Connected to RPC server at {self.host}:{self.port}")
     
-    def _remote_call(self, method_name, *args):
-        """Internal method to make JSON-RPC calls"""
+    def negotiate(self, codec_names):
+        """Ask the server to switch this connection to the first codec it knows"""
+        response = self.receive(self.submit(NEGOTIATE_METHOD, list(codec_names)))
+        if "error" not in response:  # an older server: keep JSON
+            self.codec = get_codec(response["result"])
+        return self.codec.name
+    
+    def _encode_request(self, method_name, args):
         self.request_id += 1
         request = {
             "jsonrpc": "2.0",
@@ -26,13 +51,74 @@ class RemoteCalculator:
             "params": args,
             "id": self.request_id
         }
+        return self.request_id, encode_frame(self.codec.encode(request))
+    
+    def submit(self, method_name, *args):
+        """Send a call without waiting for its response; returns its id"""
+        request_id, frame = self._encode_request(method_name, args)
+        self.socket.sendall(frame)
+        return request_id
+    
+    def receive(self, request_id):
+        """Wait for the response to one submitted call
+        
+        Responses to other outstanding calls that arrive first are kept
+        until they are asked for.
+        """
+        while request_id not in self.responses:
+            self._read_responses()
+        return self.responses.pop(request_id)
+    
+    def _read_responses(self):
+        """Read at least one frame and file everything in it
+        
+        Single responses are kept by id and batch replies are queued whole
+        for RPCBatch.flush. An error with no id (bad frame, server busy)
+        answers no call, so nobody would collect it: it is raised, but only
+        after the rest of what was read has been filed.
+        """
+        frames = recv_frames(self.socket, self.decoder)
+        if not frames:
+            raise ConnectionError("Server closed the connection")
+        unmatched = None
+        for frame in frames:
+            response = self.codec.decode(frame)
+            if isinstance(response, list):
+                self.batch_replies.append(response)
+            elif response.get("id") is None:
+                unmatched = unmatched or response
+            else:
+                self.responses[response["id"]] = response
+        if unmatched is not None:
+            raise Exception(f"Server error: {unmatched.get('error')}")
+    
+    def notify(self, method_name, *args):
+        """Send a notification: a call without an id, which gets no response"""
+        request = {
+            "jsonrpc": "2.0",
+            "method": method_name,
+            "params": args
+        }
+        self.socket.sendall(encode_frame(self.codec.encode(request)))
+    
+    @contextmanager
+    def batch(self):
+        """Buffer calls and send them as one JSON-RPC batch when the block ends
+        
+            with calc.batch() as batch:
+                batch.add(1, 2)
+                batch.notify('add', 3, 4)
+            print(batch.results)   # [3]
+        """
+        batch = RPCBatch(self)
+        yield batch
+        batch.flush()
+    
+    def _remote_call(self, method_name, *args):
+        """Internal method to make JSON-RPC calls"""
         try:
-            # Send request
-            self.socket.sendall(json.dumps(request).encode('utf-8'))
-            
-            # Receive response
-            response_data = self.socket.recv(4096)
-            response = json.loads(response_data.decode('utf-8'))
+            request_id = self.submit(method_name, *args)
+            response = self.receive(request_id)
             
             # Check for errors
             if "error" in response:
@@ -41,6 +127,27 @@ class RemoteCalculator:
         except Exception as e:
             raise Exception(f"RPC Error calling '{method_name}': {e}")
     
+    def pipeline(self, calls, window=256):
+        """Make many calls with up to `window` in flight on this connection
+        
+        calls is a list of (method_name, args) pairs. Each window of requests
+        goes out in a single write. Returns results in the same order; a
+        failed call's slot holds an Exception instead.
+        """
+        results = []
+        for start in range(0, len(calls), window):
+            encoded = [self._encode_request(method_name, args)
+                       for method_name, args in calls[start:start + window]]
+            self.socket.sendall(b''.join(frame for _, frame in encoded))
+            results.extend(self._result_or_error(request_id) for request_id, _ in encoded)
+        return results
+    
+    def _result_or_error(self, request_id):
+        response = self.receive(request_id)
+        if "error" in response:
+            return Exception(response["error"])
+        return response.get("result")
+    
     # Proxy methods that forward calls to the server
     def add(self, a, b):
         return self._remote_call('add', a, b)
@@ -69,6 +176,69 @@ class RemoteCalculator:
             self.socket.close()
             print("Disconnected from server")
 
+class RPCBatch:
+    """Calls collected by RemoteCalculator.batch()
+    
+    Calls made on it (batch.add(1, 2), ...) are only recorded; flush() sends
+    them in one message. Afterwards results holds one entry per call, in
+    call order, with an Exception for each call that failed.
+    """
+    
+    def __init__(self, calculator):
+        self.calculator = calculator
+        self.requests = []
+        self.ids = []
+        self.results = None
+    
+    def call(self, method_name, *args):
+        self.calculator.request_id += 1
+        self.requests.append({
+            "jsonrpc": "2.0",
+            "method": method_name,
+            "params": args,
+            "id": self.calculator.request_id
+        })
+        self.ids.append(self.calculator.request_id)
+    
+    def notify(self, method_name, *args):
+        self.requests.append({"jsonrpc": "2.0", "method": method_name, "params": args})
+    
+    def __getattr__(self, name):
+        # batch.add(1, 2) records a call to 'add'
+        if name not in CALCULATOR_METHODS:
+            raise AttributeError(name)
+        return lambda *args: self.call(name, *args)
+    
+    def flush(self):
+        self.results = []
+        requests, ids = self.requests, self.ids
+        self.requests, self.ids = [], []
+        if not requests:
+            return self.results
+        calculator = self.calculator
+        calculator.socket.sendall(encode_frame(calculator.codec.encode(requests)))
+        
+        # An all-notification batch gets no reply, so only wait for real calls
+        if not ids:
+            return self.results
+        while not calculator.batch_replies:
+            calculator._read_responses()
+        reply = calculator.batch_replies.popleft()
+        
+        # The reply is in any order. Errors with no id are for calls the
+        # server couldn't identify; they go to the calls left unanswered.
+        by_id = {item["id"]: item for item in reply if item.get("id") is not None}
+        unmatched = deque(item for item in reply if item.get("id") is None)
+        for request_id in ids:
+            response = by_id.get(request_id)
+            if response is None:
+                response = unmatched.popleft() if unmatched else {"error": "No response in batch reply"}
+            if "error" in response:
+                self.results.append(Exception(response["error"]))
+            else:
+                self.results.append(response.get("result"))
+        return self.results
+
 def main():
     # Create remote calculator proxy
     calc = RemoteCalculator()
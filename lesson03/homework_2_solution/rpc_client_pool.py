@@ -0,0 +1,331 @@
+import itertools
+import json
+import random
+import socket
+import threading
+import time
+
+from rpc_client import CALCULATOR_METHODS
+from rpc_framing import FrameDecoder, FrameError, encode_frame, recv_frames
+
+class RPCError(Exception):
+    """The server answered the call with an error"""
+
+class PooledConnection:
+    """One socket in the pool, plus what the pool knows about its health"""
+
+    def __init__(self, slot):
+        self.slot = slot
+        self.socket = None
+        self.decoder = FrameDecoder()
+        self.failures = 0          # consecutive failed connects, drives backoff
+        self.retry_at = 0.0        # don't try to reconnect before this time
+        self.last_used = 0.0
+        self.opened = 0            # times this slot has connected
+
+    @property
+    def connected(self):
+        return self.socket is not None
+
+    def close(self):
+        if self.socket:
+            try:
+                self.socket.close()
+            except OSError:
+                pass
+        self.socket = None
+        self.decoder = FrameDecoder()  # drop any half-read frame
+
+class RPCClientPool:
+    """Thread-safe JSON-RPC client over a pool of persistent connections
+
+    Each call checks out one idle connection, so threads never interleave
+    bytes on a socket; idle connections are handed out least recently used
+    first, which spreads calls over all of them. Connections are opened
+    lazily. A connection that fails is closed and reopened on a later call,
+    waiting backoff_base * 2**failures seconds (with jitter, capped at
+    backoff_max) between attempts. A background thread can probe idle
+    connections and reconnect broken ones.
+    """
+
+    def __init__(self, host='localhost', port=8888, size=4, timeout=5.0,
+                 connect_timeout=2.0, backoff_base=0.05, backoff_max=5.0,
+                 health_check_interval=None, health_check=('add', (0, 0)), retries=1):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.health_check = health_check
+        self.retries = retries
+
+        self.connections = [PooledConnection(slot) for slot in range(size)]
+        self.idle = list(self.connections)  # least recently used first
+        self.condition = threading.Condition()
+        self._ids = itertools.count(1)
+        self._id_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {'created': 0, 'reconnects': 0, 'connect_failures': 0,
+                      'calls': 0, 'errors': 0, 'timeouts': 0, 'health_checks': 0,
+                      'health_check_failures': 0}
+        self.closed = False
+
+        self._health_thread = None
+        if health_check_interval:
+            self._health_thread = threading.Thread(
+                target=self._health_loop, args=(health_check_interval,), daemon=True)
+            self._health_thread.start()
+
+    def next_id(self):
+        with self._id_lock:
+            return next(self._ids)
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    # ------------------------------------------------------------------
+    # Checking connections in and out
+    # ------------------------------------------------------------------
+
+    def _usable(self, connection, now):
+        return connection.connected or now >= connection.retry_at
+
+    def _checkout(self, timeout):
+        """Take an idle connection that is open or due for a reconnect"""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                if self.closed:
+                    raise ConnectionError("Pool is closed")
+                now = time.monotonic()
+                # Prefer open connections, then ones whose backoff has passed
+                for want_connected in (True, False):
+                    for connection in self.idle:
+                        if connection.connected == want_connected and self._usable(connection, now):
+                            self.idle.remove(connection)
+                            return connection
+
+                remaining = deadline - now
+                if remaining <= 0:
+                    raise ConnectionError(
+                        f"No connection to {self.host}:{self.port} available within {timeout}s")
+                # Wake up for a returned connection or the next reconnect slot
+                retry_times = [c.retry_at - now for c in self.idle if not c.connected]
+                self.condition.wait(min([remaining] + [t for t in retry_times if t > 0]))
+
+    def _checkin(self, connection):
+        connection.last_used = time.monotonic()
+        with self.condition:
+            if self.closed:
+                # Checked out while close() ran: don't leave a live socket behind
+                connection.close()
+                return
+            self.idle.append(connection)
+            self.condition.notify()
+
+    def _connect(self, connection):
+        """Open the socket; on failure schedule the next attempt with backoff"""
+        try:
+            connection.socket = socket.create_connection((self.host, self.port),
+                                                         timeout=self.connect_timeout)
+        except OSError:
+            connection.failures += 1
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (connection.failures - 1))
+            connection.retry_at = time.monotonic() + delay * random.uniform(0.5, 1.0)
+            self._count('connect_failures')
+            raise
+        if connection.opened:
+            self._count('reconnects')
+        self._count('created')
+        connection.opened += 1
+        connection.failures = 0
+
+    # ------------------------------------------------------------------
+    # Calls
+    # ------------------------------------------------------------------
+
+    def _call_on(self, connection, method_name, args, timeout):
+        if not connection.connected:
+            self._connect(connection)
+        request_id = self.next_id()
+        request = {"jsonrpc": "2.0", "method": method_name, "params": args, "id": request_id}
+        connection.socket.settimeout(timeout)
+        connection.socket.sendall(encode_frame(json.dumps(request).encode('utf-8')))
+
+        while True:
+            frames = recv_frames(connection.socket, connection.decoder)
+            if not frames:
+                raise ConnectionError("Server closed the connection")
+            for frame in frames:
+                response = json.loads(frame.decode('utf-8'))
+                if response.get("id") == request_id:
+                    return response
+
+    def call(self, method_name, *args, timeout=None):
+        """Make one call on a pooled connection
+
+        timeout bounds the wait for a free connection and each send/receive.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        self._count('calls')
+        for attempt in range(self.retries + 1):
+            connection = self._checkout(timeout)
+            if not connection.connected:
+                try:
+                    self._connect(connection)
+                except OSError as e:
+                    # Refused or timed out (socket.timeout is an OSError too):
+                    # _connect scheduled the retry, so try another connection
+                    self._checkin(connection)
+                    if attempt == self.retries:
+                        raise ConnectionError(f"RPC call '{method_name}' could not connect: {e}")
+                    continue
+            try:
+                response = self._call_on(connection, method_name, args, timeout)
+            except socket.timeout:
+                # The response may still arrive later, so this socket is unusable
+                connection.close()
+                self._count('timeouts')
+                raise TimeoutError(f"RPC call '{method_name}' timed out after {timeout}s")
+            except (OSError, FrameError, ValueError) as e:
+                # Broken or stale connection, or a frame that isn't JSON:
+                # drop it and try another
+                connection.close()
+                self._count('errors')
+                if attempt == self.retries:
+                    raise ConnectionError(f"RPC call '{method_name}' failed: {e}")
+                continue
+            finally:
+                self._checkin(connection)
+
+            if "error" in response:
+                raise RPCError(response["error"])
+            return response.get("result")
+
+    def __getattr__(self, name):
+        # pool.add(1, 2) works like RemoteCalculator.add
+        if name not in CALCULATOR_METHODS:
+            raise AttributeError(name)
+        return lambda *args: self.call(name, *args)
+
+    # ------------------------------------------------------------------
+    # Health checks and stats
+    # ------------------------------------------------------------------
+
+    def _health_loop(self, interval):
+        while not self.closed:
+            time.sleep(interval)
+            self.check_health(idle_for=interval)
+
+    def check_health(self, idle_for=0.0):
+        """Probe idle open connections and reopen broken ones that are due
+
+        A broken connection is one that was open once and has since been
+        closed, by a failed call or a failed probe.
+        """
+        now = time.monotonic()
+        with self.condition:
+            if self.closed:
+                return
+            candidates = [c for c in self.idle
+                          if (c.connected and now - c.last_used >= idle_for)
+                          or (not c.connected and c.opened and now >= c.retry_at)]
+            for connection in candidates:
+                self.idle.remove(connection)
+
+        for connection in candidates:
+            try:
+                if self.closed:
+                    continue  # _checkin below closes it
+                self._count('health_checks')
+                method_name, args = self.health_check
+                # A failed reconnect raises OSError from _connect, after
+                # scheduling the next attempt with backoff
+                self._call_on(connection, method_name, args, self.connect_timeout)
+            except (OSError, FrameError, ValueError):
+                connection.close()
+                self._count('health_check_failures')
+            finally:
+                self._checkin(connection)
+
+    def pool_stats(self):
+        with self.condition:
+            idle_open = sum(1 for c in self.idle if c.connected)
+            idle_closed = len(self.idle) - idle_open
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return dict(stats, size=len(self.connections),
+                    in_use=len(self.connections) - idle_open - idle_closed,
+                    idle=idle_open, disconnected=idle_closed)
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            for connection in self.connections:
+                connection.close()
+            self.condition.notify_all()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def demo():
+    """Share one pool between threads while the server restarts underneath it"""
+    import multiprocessing
+    from rpc_pipeline_benchmark import run_quiet_server, start_background_server
+
+    process, port = start_background_server()
+    pool = RPCClientPool(port=port, size=4, timeout=2.0, health_check_interval=0.5)
+    results = []
+    errors = []
+
+    def worker(offset):
+        for i in range(200):
+            try:
+                results.append(pool.add(offset, i) == offset + i)
+            except (ConnectionError, TimeoutError, RPCError) as e:
+                errors.append(type(e).__name__)
+            time.sleep(0.005)
+
+    threads = [threading.Thread(target=worker, args=(n * 1000,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+
+    # Kill the server halfway through and bring it back on the same port
+    time.sleep(0.3)
+    process.terminate()
+    process.join()
+    time.sleep(0.5)
+    process = multiprocessing.Process(target=run_quiet_server, args=(port,), daemon=True)
+    process.start()
+
+    for thread in threads:
+        thread.join()
+
+    # Restart once more while the pool sits idle: no call runs, so only the
+    # health checker can notice the dead sockets and reopen them
+    before = pool.pool_stats()
+    process.terminate()
+    process.join()
+    process = multiprocessing.Process(target=run_quiet_server, args=(port,), daemon=True)
+    process.start()
+    time.sleep(2.0)
+    after = pool.pool_stats()
+
+    print("\nRPC CLIENT POOL (8 threads, 4 connections, server restarted mid-run)")
+    print("=" * 60)
+    print(f"Calls answered correctly: {sum(results)} of {len(results)}")
+    print(f"Calls failed while the server was down: {len(errors)}")
+    print(f"Idle restart: health checks reopened {after['reconnects'] - before['reconnects']} "
+          f"connections before the next call ({after['idle']} of {after['size']} open)")
+    for key, value in after.items():
+        print(f"  {key:<21} {value}")
+    pool.close()
+    process.terminate()
+
+if __name__ == "__main__":
+    demo()
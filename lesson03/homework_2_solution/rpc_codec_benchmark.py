@@ -0,0 +1,75 @@
+import contextlib
+import io
+import time
+
+from rpc_client import RemoteCalculator
+from rpc_codecs import CODECS, msgpack
+from rpc_framing import HEADER
+from rpc_pipeline_benchmark import start_background_server
+
+# A typical small numeric call and its answer
+SAMPLE_REQUEST = {"jsonrpc": "2.0", "method": "add", "params": [123456, 7.5], "id": 4242}
+SAMPLE_RESPONSE = {"jsonrpc": "2.0", "result": 123463.5, "id": 4242}
+
+def serialization_cost(codec, iterations=100000):
+    """Seconds per call spent encoding and decoding one request and its response"""
+    encode, decode = codec.encode, codec.decode
+    request, response = SAMPLE_REQUEST, SAMPLE_RESPONSE
+    start_time = time.perf_counter()
+    for _ in range(iterations):
+        decode(encode(request))
+        decode(encode(response))
+    return (time.perf_counter() - start_time) / iterations
+
+def wire_bytes(codec):
+    """Bytes on the wire for one call, frame headers included"""
+    return (2 * HEADER.size + len(codec.encode(SAMPLE_REQUEST))
+            + len(codec.encode(SAMPLE_RESPONSE)))
+
+def calls_per_second(port, codec_name, num_calls, window):
+    with contextlib.redirect_stdout(io.StringIO()):  # no connect/disconnect lines
+        calc = RemoteCalculator(port=port, codec=codec_name)
+    calls = [('add', (i, 0.5)) for i in range(num_calls)]
+    try:
+        assert calc.codec.name == codec_name, f"server did not accept {codec_name}"
+        start_time = time.perf_counter()
+        answers = calc.pipeline(calls, window=window)
+        rate = num_calls / (time.perf_counter() - start_time)
+        assert answers == [a + b for _, (a, b) in calls]
+    finally:
+        with contextlib.redirect_stdout(io.StringIO()):
+            calc.close()
+    return rate
+
+def benchmark_codecs(num_calls=20000, window=256, iterations=100000):
+    """Serialization cost, bytes per call and pipelined throughput per codec"""
+    if msgpack is None:
+        print("Please install msgpack: pip install msgpack (skipping MessagePack)")
+
+    process, port = start_background_server()
+    results = {}
+    try:
+        print(f"\nRPC WIRE CODECS (add with an int and a float, {num_calls:,} pipelined calls)")
+        print("=" * 60)
+        print(f"{'Codec':<14}{'Encode+decode':>15}{'Bytes/call':>12}{'Calls/sec':>12}")
+        print("-" * 53)
+        for name, codec in CODECS.items():
+            cost = serialization_cost(codec, iterations)
+            size = wire_bytes(codec)
+            rate = calls_per_second(port, name, num_calls, window)
+            results[name] = {'seconds_per_call': cost, 'bytes_per_call': size,
+                             'calls_per_second': rate}
+            print(f"{codec.label:<14}{cost * 1e6:>13.2f}us{size:>12}{rate:>12,.0f}")
+    finally:
+        process.terminate()
+
+    json_result = results['json']
+    for name, stats in results.items():
+        if name != 'json':
+            print(f"{CODECS[name].label}: {json_result['seconds_per_call'] / stats['seconds_per_call']:.1f}x "
+                  f"faster to serialize, {stats['bytes_per_call'] / json_result['bytes_per_call']:.0%} "
+                  f"of the JSON bytes")
+    return results
+
+if __name__ == "__main__":
+    benchmark_codecs()
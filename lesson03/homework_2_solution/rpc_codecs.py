@@ -0,0 +1,231 @@
+import json
+import struct
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None  # pip install msgpack to enable the MessagePack codec
+
+# A connection starts out speaking JSON. A client that wants something more
+# compact sends this call first with the codecs it can use, best first; the
+# server answers (in JSON) with the one it picked and both sides switch.
+# Servers that don't know the method answer "not found", so the client
+# simply stays on JSON.
+NEGOTIATE_METHOD = "rpc.negotiate"
+
+class JSONCodec:
+    """Plain JSON text, readable and understood by every client"""
+    name = 'json'
+    label = 'JSON'
+
+    def encode(self, message):
+        return json.dumps(message).encode('utf-8')
+
+    def decode(self, data):
+        return json.loads(data.decode('utf-8'))
+
+class MsgpackCodec:
+    """MessagePack: the same messages as JSON in a binary encoding"""
+    name = 'msgpack'
+    label = 'MessagePack'
+    BIG_INT = 1  # ext type for ints outside 64 bits, e.g. the result of power(2, 100)
+
+    def encode(self, message):
+        try:
+            return msgpack.packb(message, use_bin_type=True)
+        except OverflowError:
+            return msgpack.packb(self._wrap_big_ints(message), use_bin_type=True)
+
+    def decode(self, data):
+        return msgpack.unpackb(data, raw=False, ext_hook=self._ext_hook)
+
+    def _wrap_big_ints(self, obj):
+        if isinstance(obj, int) and not -2 ** 63 <= obj < 2 ** 64:
+            return msgpack.ExtType(self.BIG_INT, str(obj).encode('ascii'))
+        if isinstance(obj, dict):
+            return {key: self._wrap_big_ints(value) for key, value in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return [self._wrap_big_ints(item) for item in obj]
+        return obj
+
+    def _ext_hook(self, code, data):
+        if code == self.BIG_INT:
+            return int(data)
+        return msgpack.ExtType(code, data)
+
+class StructCodec:
+    """Fixed binary layouts for the common case: one call with numeric params
+
+    request:       b'R' id:u32 len:u8 method count:u8 types values
+    notification:  b'N' len:u8 method count:u8 types values
+    result:        b'r' id:u32 type value
+    error:         b'e' id:u32 utf-8 message
+
+    types has one struct format character per value ('i' int32, 'q' int64,
+    'd' float64) and the values follow packed with exactly that format, so
+    each message is one struct.pack and one unpack_from. Anything else
+    (batches, string params, a null id, big ints) is sent as b'J' followed
+    by JSON, so every message still gets through.
+    """
+    name = 'struct'
+    label = 'struct'
+
+    ID = struct.Struct('!I')
+
+    def __init__(self):
+        self.fallback = JSONCodec()
+        self.formats = {}  # types string -> compiled Struct
+        self.methods = {}  # method name <-> its length-prefixed bytes
+
+    def _format(self, types):
+        compiled = self.formats.get(types)
+        if compiled is None:
+            # types can come off the wire: allow only our three codes, and
+            # don't let a client fill the cache with every combination
+            if types.strip('iqd'):
+                raise ValueError(f"Bad value types {types!r}")
+            compiled = struct.Struct('!' + types)
+            if len(self.formats) < 1024:
+                self.formats[types] = compiled
+        return compiled
+
+    def _types(self, values):
+        """Format characters for a sequence of numbers, or None if one isn't packable"""
+        types = []
+        for value in values:
+            kind = type(value)
+            if kind is int:
+                if -2 ** 31 <= value < 2 ** 31:
+                    types.append('i')
+                elif -2 ** 63 <= value < 2 ** 63:
+                    types.append('q')
+                else:
+                    return None
+            elif kind is float:
+                types.append('d')
+            else:
+                return None
+        return ''.join(types)
+
+    def _method_bytes(self, method):
+        packed = self.methods.get(method)
+        if packed is None:
+            encoded = method.encode('utf-8')
+            if len(encoded) > 255:
+                return None
+            packed = self.methods[method] = bytes([len(encoded)]) + encoded
+            self.methods[packed] = method
+        return packed
+
+    def _encode_call(self, message):
+        method, params = message["method"], message.get("params", [])
+        if type(method) is not str or not isinstance(params, (list, tuple)) or len(params) > 255:
+            return None
+        method = self._method_bytes(method)
+        types = self._types(params)
+        if method is None or types is None:
+            return None
+        body = (method + bytes([len(types)]) + types.encode('ascii')
+                + self._format(types).pack(*params))
+        if "id" not in message:
+            return b'N' + body
+        if self._packable_id(message["id"]):
+            return b'R' + self.ID.pack(message["id"]) + body
+        return None
+
+    def _packable_id(self, request_id):
+        return type(request_id) is int and 0 <= request_id < 2 ** 32
+
+    def encode(self, message):
+        if type(message) is dict:
+            if "method" in message:
+                encoded = self._encode_call(message)
+                if encoded is not None:
+                    return encoded
+            elif self._packable_id(message.get("id")):
+                if "result" in message:
+                    types = self._types((message["result"],))
+                    if types is not None:
+                        return (b'r' + self.ID.pack(message["id"]) + types.encode('ascii')
+                                + self._format(types).pack(message["result"]))
+                elif type(message.get("error")) is str:
+                    return b'e' + self.ID.pack(message["id"]) + message["error"].encode('utf-8')
+        return b'J' + self.fallback.encode(message)
+
+    def _decode_call(self, data, offset):
+        end = offset + 1 + data[offset]
+        method_bytes = data[offset:end]
+        method = self.methods.get(method_bytes)
+        if method is None:
+            method = method_bytes[1:].decode('utf-8')
+        count = data[end]
+        types = data[end + 1:end + 1 + count].decode('ascii')
+        params = list(self._format(types).unpack_from(data, end + 1 + count))
+        return method, params
+
+    def decode(self, data):
+        # struct.error and IndexError mean a truncated or corrupt message;
+        # report them as ValueError like json.loads does
+        kind = data[:1]
+        try:
+            if kind == b'R':
+                (request_id,) = self.ID.unpack_from(data, 1)
+                method, params = self._decode_call(data, 5)
+                return {"jsonrpc": "2.0", "method": method, "params": params, "id": request_id}
+            if kind == b'r':
+                (request_id,) = self.ID.unpack_from(data, 1)
+                (result,) = self._format(data[5:6].decode('ascii')).unpack_from(data, 6)
+                return {"jsonrpc": "2.0", "result": result, "id": request_id}
+            if kind == b'J':
+                return self.fallback.decode(data[1:])
+            if kind == b'N':
+                method, params = self._decode_call(data, 1)
+                return {"jsonrpc": "2.0", "method": method, "params": params}
+            if kind == b'e':
+                (request_id,) = self.ID.unpack_from(data, 1)
+                return {"jsonrpc": "2.0", "error": data[5:].decode('utf-8'), "id": request_id}
+        except (struct.error, IndexError) as e:
+            raise ValueError(f"Corrupt struct message: {e}")
+        raise ValueError(f"Unknown message type {kind!r}")
+
+JSON_CODEC = JSONCodec()
+
+# Codecs this process can speak, in order of preference
+CODECS = {'struct': StructCodec(), 'json': JSON_CODEC}
+if msgpack is not None:
+    CODECS = {'struct': CODECS['struct'], 'msgpack': MsgpackCodec(), 'json': JSON_CODEC}
+
+def get_codec(name):
+    if name == 'msgpack' and msgpack is None:
+        raise ValueError("Please install msgpack: pip install msgpack")
+    if name not in CODECS:
+        raise ValueError(f"Unknown codec '{name}', expected one of {list(CODECS)}")
+    return CODECS[name]
+
+def negotiation_offer(data):
+    """If a frame is the negotiation call, return (offered codec names, id)
+
+    offered is None when the params are not [list of codec name strings].
+    A negotiation sent as a notification is left alone: with no reply,
+    the client could not know which codec the server switched to.
+    """
+    try:
+        request = json.loads(data.decode('utf-8'))
+    except ValueError:
+        return None
+    if (not isinstance(request, dict) or request.get("method") != NEGOTIATE_METHOD
+            or "id" not in request):
+        return None
+    params = request.get("params")
+    if (isinstance(params, list) and params and isinstance(params[0], list)
+            and all(isinstance(name, str) for name in params[0])):
+        return params[0], request["id"]
+    return None, request["id"]
+
+def choose_codec(offered, supported=None):
+    """First codec in the client's list that this side also supports (else JSON)"""
+    supported = CODECS if supported is None else supported
+    for name in offered:
+        if name in supported and name in CODECS:
+            return CODECS[name]
+    return JSON_CODEC
@@ -0,0 +1,53 @@
+import struct
+
+# Every message on the wire is a 4-byte big-endian length followed by that
+# many bytes of UTF-8 JSON, so a message can be any size and several can
+# arrive in one recv() without being mixed up.
+HEADER = struct.Struct('!I')
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+class FrameError(Exception):
+    """The byte stream does not contain valid frames"""
+
+def encode_frame(payload):
+    """Prefix a payload with its length"""
+    if len(payload) > MAX_FRAME_SIZE:
+        raise FrameError(f"Frame of {len(payload)} bytes exceeds {MAX_FRAME_SIZE}")
+    return HEADER.pack(len(payload)) + payload
+
+class FrameDecoder:
+    """Streaming decoder: feed it whatever recv() returned, get whole frames back"""
+
+    def __init__(self, max_frame_size=MAX_FRAME_SIZE):
+        self.max_frame_size = max_frame_size
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        """Add received bytes and return every frame now complete"""
+        self.buffer += data
+        frames = []
+        offset = 0
+        while len(self.buffer) - offset >= HEADER.size:
+            (length,) = HEADER.unpack_from(self.buffer, offset)
+            if length > self.max_frame_size:
+                raise FrameError(f"Frame of {length} bytes exceeds {self.max_frame_size}")
+            end = offset + HEADER.size + length
+            if len(self.buffer) < end:
+                break  # rest of this frame hasn't arrived yet
+            frames.append(bytes(self.buffer[offset + HEADER.size:end]))
+            offset = end
+        del self.buffer[:offset]
+        return frames
+
+def send_frame(sock, payload):
+    sock.sendall(encode_frame(payload))
+
+def recv_frames(sock, decoder, bufsize=65536):
+    """Block until at least one frame is complete; return [] when the peer closed"""
+    while True:
+        data = sock.recv(bufsize)
+        if not data:
+            return []
+        frames = decoder.feed(data)
+        if frames:
+            return frames
@@ -0,0 +1,78 @@
+import multiprocessing
+import os
+import socket
+import sys
+import time
+
+from rpc_client import RemoteCalculator
+from rpc_server import RPCServer
+
+def run_quiet_server(port):
+    """Process target: an RPCServer that doesn't print every connection"""
+    sys.stdout = open(os.devnull, 'w')
+    RPCServer(port=port).start()
+
+def start_background_server():
+    """Run an RPCServer on a free port in its own process (so it has its own GIL)"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('localhost', 0))
+        port = sock.getsockname()[1]
+    process = multiprocessing.Process(target=run_quiet_server, args=(port,), daemon=True)
+    process.start()
+
+    # Wait until it accepts connections
+    for _ in range(100):
+        try:
+            socket.create_connection(('localhost', port), timeout=1).close()
+            return process, port
+        except OSError:
+            time.sleep(0.05)
+    process.terminate()
+    raise RuntimeError("RPC server did not start")
+
+def benchmark_pipelining(num_calls=20000, windows=(1, 16, 256), batch_sizes=(1000,)):
+    """Calls per second over one connection: lock-step, pipelined and batched"""
+    process, port = start_background_server()
+    calls = [('add', (i, 1)) for i in range(num_calls)]
+
+    print(f"\nJSON-RPC CALLS OVER ONE CONNECTION ({num_calls:,} calls)")
+    print("=" * 50)
+    print(f"{'Mode':<24}{'Calls/sec':>12}{'Speedup':>10}")
+    print("-" * 46)
+
+    calc = RemoteCalculator(port=port)
+    try:
+        start_time = time.perf_counter()
+        for method_name, args in calls:
+            getattr(calc, method_name)(*args)
+        lockstep = num_calls / (time.perf_counter() - start_time)
+        print(f"{'Lock-step':<24}{lockstep:>12,.0f}{1:>9.1f}x")
+
+        results = {'lock-step': lockstep}
+        for window in windows:
+            start_time = time.perf_counter()
+            answers = calc.pipeline(calls, window=window)
+            rate = num_calls / (time.perf_counter() - start_time)
+            assert answers == [a + b for _, (a, b) in calls]
+            results[f'window {window}'] = rate
+            print(f"{f'Pipelined, window {window}':<24}{rate:>12,.0f}{rate / lockstep:>9.1f}x")
+
+        for batch_size in batch_sizes:
+            answers = []
+            start_time = time.perf_counter()
+            for start in range(0, num_calls, batch_size):
+                with calc.batch() as batch:
+                    for method_name, args in calls[start:start + batch_size]:
+                        batch.call(method_name, *args)
+                answers.extend(batch.results)
+            rate = num_calls / (time.perf_counter() - start_time)
+            assert answers == [a + b for _, (a, b) in calls]
+            results[f'batch {batch_size}'] = rate
+            print(f"{f'Batches of {batch_size}':<24}{rate:>12,.0f}{rate / lockstep:>9.1f}x")
+    finally:
+        calc.close()
+        process.terminate()
+    return results
+
+if __name__ == "__main__":
+    benchmark_pipelining()
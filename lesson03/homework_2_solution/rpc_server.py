@@ -1,14 +1,22 @@
 import socket
-import json
 import threading
 import math
+from concurrent.futures import ThreadPoolExecutor
+from rpc_framing import FrameDecoder, encode_frame
+from rpc_codecs import CODECS, JSON_CODEC, NEGOTIATE_METHOD, choose_codec, negotiation_offer
 
 class RPCServer:
-    def __init__(self, host='localhost', port=8888):
+    def __init__(self, host='localhost', port=8888, batch_workers=0, codecs=None):
         self.host = host
         self.port = port
         self.methods = {}
         
+        # Wire formats a client may negotiate (see rpc_codecs); JSON is always allowed
+        self.codecs = list(CODECS) if codecs is None else list(codecs) + ['json']
+        
+        # With batch_workers > 0 the calls in a batch run in parallel threads
+        self.batch_executor = ThreadPoolExecutor(max_workers=batch_workers) if batch_workers else None
+        
         # Register built-in methods
         self.register_method('add', self.add)
         self.register_method('subtract', self.subtract)
@@ -50,57 +58,140 @@ class RPCServer:
             raise ValueError("Modulo by zero")
         return a % b
     
-    def handle_client(self, client_socket):
-        """Handle RPC requests from a client (JSON-RPC 2.0 format)"""
+    def handle_request(self, data, codec=JSON_CODEC):
+        """Turn one request message into a response (JSON-RPC 2.0 format)
+        
+        The message is a single request object or a batch array of them,
+        in the connection's codec. Returns a response dict, a list of them
+        for a batch, or None when there is nothing to send back (only
+        notifications).
+        """
         try:
-            while True:
-                data = client_socket.recv(4096)
-                if not data:
-                    break
-                
-                try:
-                    request = json.loads(data.decode('utf-8'))
-                    method = request.get("method")
-                    params = request.get("params", [])
-                    request_id = request.get("id")
+            request = codec.decode(data)
+        except ValueError:
+            return {
+                "jsonrpc": "2.0",
+                "error": f"Invalid {codec.label} format",
+                "id": None
+            }
+        
+        if not isinstance(request, list):
+            return self.dispatch(request)
+        
+        if not request:
+            return {
+                "jsonrpc": "2.0",
+                "error": "Invalid Request: empty batch",
+                "id": None
+            }
+        if self.batch_executor:
+            responses = list(self.batch_executor.map(self.dispatch, request))
+        else:
+            responses = [self.dispatch(item) for item in request]
+        
+        # Notifications get no entry; an all-notification batch gets no reply
+        responses = [response for response in responses if response is not None]
+        return responses or None
 
-                    if method not in self.methods:
-                        response = {
-                            "jsonrpc": "2.0",
-                            "error": f"Method '{method}' not found",
-                            "id": request_id
-                        }
-                    else:
-                        try:
-                            # Call the method dynamically
-                            result = self.methods[method](*params)
-                            response = {
-                                "jsonrpc": "2.0",
-                                "result": result,
-                                "id": request_id
-                            }
-                        except Exception as e:
-                            response = {
-                                "jsonrpc": "2.0",
-                                "error": str(e),
-                                "id": request_id
-                            }
+    def dispatch(self, request):
+        """Run one request object; returns None for a notification (no id)"""
+        if not isinstance(request, dict):
+            return {
+                "jsonrpc": "2.0",
+                "error": "Invalid Request",
+                "id": None
+            }
+        
+        is_notification = "id" not in request
+        try:
+            method = request.get("method")
+            params = request.get("params", [])
+            request_id = request.get("id")
 
-                except json.JSONDecodeError:
+            if method not in self.methods:
+                response = {
+                    "jsonrpc": "2.0",
+                    "error": f"Method '{method}' not found",
+                    "id": request_id
+                }
+            else:
+                try:
+                    # Call the method dynamically
+                    result = self.methods[method](*params)
                     response = {
                         "jsonrpc": "2.0",
-                        "error": "Invalid JSON format",
-                        "id": None
+                        "result": result,
+                        "id": request_id
                     }
                 except Exception as e:
                     response = {
                         "jsonrpc": "2.0",
                         "error": str(e),
-                        "id": None
+                        "id": request_id
                     }
 
-                # Send the response back to the client
-                client_socket.sendall(json.dumps(response).encode('utf-8'))
+        except Exception as e:
+            response = {
+                "jsonrpc": "2.0",
+                "error": str(e),
+                "id": None
+            }
+        return None if is_notification else response
+
+    def negotiate(self, frame):
+        """Answer a codec negotiation call; returns (codec, response) or None
+        
+        Only the first frame on a connection can switch its codec.
+        """
+        offer = negotiation_offer(frame)
+        if offer is None:
+            return None
+        offered, request_id = offer
+        if offered is None:
+            return JSON_CODEC, {
+                "jsonrpc": "2.0",
+                "error": f"Invalid params for '{NEGOTIATE_METHOD}': expected a list of codec names",
+                "id": request_id
+            }
+        codec = choose_codec(offered, self.codecs)
+        return codec, {
+            "jsonrpc": "2.0",
+            "result": codec.name,
+            "id": request_id
+        }
+
+    def handle_client(self, client_socket):
+        """Handle framed RPC requests from a client
+        
+        Requests may be pipelined: every complete frame in the buffer is
+        answered in order, and the client matches responses by id.
+        """
+        decoder = FrameDecoder()
+        codec = JSON_CODEC
+        first_frame = True
+        try:
+            while True:
+                data = client_socket.recv(65536)
+                if not data:
+                    break
+                
+                responses = []
+                for frame in decoder.feed(data):
+                    if first_frame:
+                        first_frame = False
+                        negotiated = self.negotiate(frame)
+                        if negotiated is not None:
+                            # The answer goes out in JSON, later frames in the new codec
+                            codec, response = negotiated
+                            responses.append(encode_frame(JSON_CODEC.encode(response)))
+                            continue
+                    response = self.handle_request(frame, codec)
+                    if response is not None:
+                        responses.append(encode_frame(codec.encode(response)))
+                
+                # Send the responses back to the client in one write
+                if responses:
+                    client_socket.sendall(b''.join(responses))
         
         except Exception as e:
             print(f"Error handling client: {e}")
@@ -110,6 +201,8 @@ class RPCServer:
     def start(self):
         """Start the RPC server"""
         server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # Rebind right after a restart even if old connections are in TIME_WAIT
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         server_socket.bind((self.host, self.port))
         server_socket.listen(5)
         print(f"JSON-RPC Server listening on {self.host}:{self.port}")
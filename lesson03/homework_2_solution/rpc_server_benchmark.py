@@ -0,0 +1,113 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import time
+
+from rpc_framing import HEADER, encode_frame
+from rpc_server import RPCServer
+from async_rpc_server import AsyncRPCServer
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def raise_file_limit():
+    """Every client socket is a file descriptor; allow as many as the OS will"""
+    if resource is not None:
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+def run_server(kind, port):
+    """Process target: run the threaded or asyncio server quietly"""
+    raise_file_limit()
+    sys.stdout = open(os.devnull, 'w')
+    server = AsyncRPCServer(port=port) if kind == 'async' else RPCServer(port=port)
+    server.start()
+
+def start_server_process(kind):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('localhost', 0))
+        port = sock.getsockname()[1]
+    process = multiprocessing.Process(target=run_server, args=(kind, port), daemon=True)
+    process.start()
+
+    for _ in range(100):
+        try:
+            socket.create_connection(('localhost', port), timeout=1).close()
+            return process, port
+        except OSError:
+            time.sleep(0.05)
+    process.terminate()
+    raise RuntimeError(f"{kind} server did not start")
+
+async def client(port, num_requests, connect_timeout):
+    """One client: connect, make num_requests lock-step calls; returns calls completed"""
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection('localhost', port), connect_timeout)
+    except (OSError, asyncio.TimeoutError):
+        return None  # never connected
+
+    completed = 0
+    try:
+        for i in range(num_requests):
+            request = {"jsonrpc": "2.0", "method": "add", "params": [i, 1], "id": i}
+            writer.write(encode_frame(json.dumps(request).encode('utf-8')))
+            await writer.drain()
+            header = await asyncio.wait_for(reader.readexactly(HEADER.size), connect_timeout)
+            (length,) = HEADER.unpack(header)
+            response = json.loads(await reader.readexactly(length))
+            if "result" in response:
+                completed += 1
+    except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+        pass
+    finally:
+        writer.close()
+    return completed
+
+async def run_clients(port, num_clients, num_requests, connect_timeout):
+    start_time = time.perf_counter()
+    results = await asyncio.gather(*(client(port, num_requests, connect_timeout)
+                                     for _ in range(num_clients)))
+    elapsed = time.perf_counter() - start_time
+    connected = sum(1 for result in results if result is not None)
+    completed = sum(result for result in results if result)
+    return {
+        'connected': connected,
+        'completed': completed,
+        'seconds': elapsed,
+        'requests_per_second': completed / elapsed
+    }
+
+def benchmark_servers(client_counts=(100, 1000, 10000), requests_per_client=20,
+                      connect_timeout=10.0):
+    """Connections served and req/s for the threaded vs the asyncio server"""
+    raise_file_limit()
+
+    print(f"\nTHREADED vs ASYNCIO RPC SERVER ({requests_per_client} calls per client)")
+    print("=" * 60)
+    print(f"{'Server':<10}{'Clients':>9}{'Connected':>11}{'Calls OK':>10}{'Time':>9}{'Req/s':>10}")
+    print("-" * 60)
+
+    results = {}
+    for num_clients in client_counts:
+        for kind in ('threaded', 'async'):
+            process, port = start_server_process(kind)
+            try:
+                stats = asyncio.run(run_clients(port, num_clients, requests_per_client,
+                                                connect_timeout))
+            finally:
+                process.terminate()
+                process.join()
+            results[(kind, num_clients)] = stats
+            print(f"{kind:<10}{num_clients:>9,}{stats['connected']:>11,}"
+                  f"{stats['completed']:>10,}{stats['seconds']:>8.1f}s"
+                  f"{stats['requests_per_second']:>10,.0f}")
+    return results
+
+if __name__ == "__main__":
+    benchmark_servers()
@@ -8,38 +8,106 @@ This lab demonstrates:
 2. Race conditions in shared data access
 3. Performance analysis and speedup calculation
 4. Thread synchronization with locks
+5. Zero-copy process parallelism over a NumPy array in shared memory
+6. Scaling of thread, process and subinterpreter executors
+7. Streaming reductions over memory-mapped files larger than RAM
 """
 
+import json
+import mmap
+import os
+import platform
+import sys
 import threading
 import time
 import random
+import tempfile
+from functools import reduce
 import matplotlib.pyplot as plt
-from typing import List, Tuple
+from array import array
+from typing import Dict, List, Optional, Tuple
 import concurrent.futures
+from multiprocessing import shared_memory
 import numpy as np
 
+import array_sum_workers
+
+EXECUTORS = ("threads", "processes", "interpreters")
+
+def available_executors() -> List[str]:
+    """Executor backends this Python can run."""
+    executors = ["threads", "processes"]
+    if hasattr(concurrent.futures, "InterpreterPoolExecutor"):  # Python 3.14+
+        executors.append("interpreters")
+    return executors
+
+def gil_enabled() -> bool:
+    """False on a free-threaded build with the GIL off, where threads scale."""
+    return getattr(sys, "_is_gil_enabled", lambda: True)()
+
 class ArraySumLab:
-    def __init__(self, array_size: int = 1000000):
-        """Initialize the lab with a large array for testing."""
+    def __init__(self, array_size: int = 1000000, backend: str = "list"):
+        """Initialize the lab with a large array for testing.
+        
+        backend="list" builds a Python list like the original lab.
+        backend="numpy" fills a NumPy int64 array that lives in shared memory,
+        which takes a second instead of minutes for 100 million elements and
+        lets process-pool workers read it without copying.
+        """
         self.array_size = array_size
-        self.test_array = [random.randint(1, 100) for _ in range(array_size)]
-        self.expected_sum = sum(self.test_array)  # Calculate correct answer
+        self.backend = backend
+        self.shm: Optional[shared_memory.SharedMemory] = None
+        
+        if backend == "numpy":
+            self.shm = shared_memory.SharedMemory(create=True, size=array_size * 8)
+            self.test_array = np.ndarray((array_size,), dtype=np.int64, buffer=self.shm.buf)
+            self.test_array[:] = np.random.default_rng().integers(1, 101, size=array_size)
+            self.expected_sum = int(self.test_array.sum())
+        elif backend == "list":
+            self.test_array = [random.randint(1, 100) for _ in range(array_size)]
+            self.expected_sum = sum(self.test_array)  # Calculate correct answer
+        else:
+            raise ValueError(f"Unknown backend: {backend}")
         
         # Variables for demonstrating race conditions
         self.unsafe_sum = 0
         self.safe_sum = 0
         self.lock = threading.Lock()
         
-        print(f"🧪 Lab initialized with array of {array_size:,} elements")
+        print(f"🧪 Lab initialized with array of {array_size:,} elements ({backend} backend)")
         print(f"✓ Expected sum: {self.expected_sum:,}")
         print("-" * 60)
 
+    def close(self):
+        """Release the shared memory block."""
+        if self.shm is not None:
+            if self.backend == "numpy":
+                del self.test_array  # drop the view before closing its buffer
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def _shared_block_name(self) -> str:
+        """Name of a shared int64 copy of the array, made once for the list backend."""
+        if self.shm is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=max(8, self.array_size * 8))
+            view = self.shm.buf.cast('q')
+            view[:self.array_size] = array('q', self.test_array)
+            view.release()
+        return self.shm.name
+
+    def _sum_range(self, start_idx: int, end_idx: int) -> int:
+        """Sum part of the array: a list slice copies, a NumPy slice is a view."""
+        if self.backend == "numpy":
+            return int(self.test_array[start_idx:end_idx].sum())
+        return sum(self.test_array[start_idx:end_idx])
+
     def single_threaded_sum(self) -> Tuple[int, float]:
         """Calculate sum using single thread and measure time."""
         print("🔄 Running single-threaded sum...")
         
         start_time = time.time()
-        result = sum(self.test_array)
+        result = self._sum_range(0, self.array_size)
         end_time = time.time()
         
         execution_time = end_time - start_time
@@ -50,7 +118,7 @@ class ArraySumLab:
 
     def worker_thread_unsafe(self, start_idx: int, end_idx: int):
         """Worker thread that adds to shared variable WITHOUT synchronization."""
-        partial_sum = sum(self.test_array[start_idx:end_idx])
+        partial_sum = self._sum_range(start_idx, end_idx)
         
         # RACE CONDITION: Multiple threads modifying shared variable
         # This will likely produce incorrect results!
@@ -60,7 +128,7 @@ class ArraySumLab:
 
     def worker_thread_safe(self, start_idx: int, end_idx: int):
         """Worker thread that adds to shared variable WITH synchronization."""
-        partial_sum = sum(self.test_array[start_idx:end_idx])
+        partial_sum = self._sum_range(start_idx, end_idx)
         
         # THREAD SAFE: Using lock to protect shared variable
         with self.lock:
@@ -140,13 +208,20 @@ class ArraySumLab:
         
         return self.safe_sum, execution_time
 
-    def optimal_multi_threaded_sum(self, num_threads: int = 4) -> Tuple[int, float]:
-        """Optimal multi-threaded approach - no shared variables!"""
+    def optimal_multi_threaded_sum(self, num_threads: int = 4,
+                                   executor: str = "threads") -> Tuple[int, float]:
+        """Optimal multi-threaded approach - no shared variables!
+        
+        executor="processes" or "interpreters" runs the same chunks in worker
+        processes or subinterpreters instead of threads (see _pool_sum).
+        """
+        if executor != "threads":
+            return self._pool_sum(num_threads, executor)
         print(f"⚡ Running OPTIMAL multi-threaded sum with {num_threads} threads...")
         
         def worker_thread_optimal(start_idx: int, end_idx: int) -> int:
             """Worker that returns its result instead of modifying shared state."""
-            return sum(self.test_array[start_idx:end_idx])
+            return self._sum_range(start_idx, end_idx)
         
         # Calculate chunk size
         chunk_size = len(self.test_array) // num_threads
@@ -177,33 +252,150 @@ class ArraySumLab:
         
         return result, execution_time
 
-    def run_performance_comparison(self, max_threads: int = 8):
-        """Compare performance across different thread counts."""
+    def vectorized_sum(self) -> Tuple[int, float]:
+        """Single-core NumPy reduction: the honest baseline for parallel speedup."""
+        if self.backend != "numpy":
+            raise ValueError("vectorized_sum needs the numpy backend")
+        print("🔄 Running vectorized single-core sum...")
+        
+        start_time = time.perf_counter()
+        result = int(self.test_array.sum())
+        execution_time = time.perf_counter() - start_time
+        
+        print(f"   Result: {result:,}")
+        print(f"   Time: {execution_time:.4f} seconds")
+        return result, execution_time
+
+    def _pool_sum(self, num_workers: int, executor: str) -> Tuple[int, float]:
+        """Sum with worker processes or subinterpreters that map shared memory.
+        
+        Only the shared memory block name and (start, end) index ranges cross
+        to the workers; nothing is pickled per chunk. Workers are started and
+        attached before the clock starts, so the time is the reduction itself.
+        """
+        if executor == "processes":
+            pool_class = concurrent.futures.ProcessPoolExecutor
+        elif executor == "interpreters" and "interpreters" in available_executors():
+            pool_class = concurrent.futures.InterpreterPoolExecutor
+        else:
+            raise ValueError(f"Executor not available here: {executor}")
+        print(f"⚡ Running shared-memory sum with {num_workers} {executor}...")
+        
+        # numpy can't be loaded in subinterpreters, so they sum a memoryview
+        vectorized = self.backend == "numpy" and executor == "processes"
+        chunk_size = self.array_size // num_workers
+        ranges = [(i * chunk_size, (i + 1) * chunk_size if i < num_workers - 1 else self.array_size)
+                  for i in range(num_workers)]
+        
+        with pool_class(max_workers=num_workers, initializer=array_sum_workers.attach,
+                        initargs=(self._shared_block_name(), self.array_size, vectorized)) as pool:
+            # Warm-up: start every worker and attach the shared block
+            list(pool.map(array_sum_workers.sum_range, [0] * num_workers, [0] * num_workers))
+            
+            start_time = time.perf_counter()
+            futures = [pool.submit(array_sum_workers.sum_range, start, end) for start, end in ranges]
+            result = sum(future.result() for future in futures)
+            execution_time = time.perf_counter() - start_time
+        
+        print(f"   Result: {result:,}")
+        print(f"   Time: {execution_time:.4f} seconds")
+        print(f"   ✅ Correct? {result == self.expected_sum}")
+        return result, execution_time
+
+    def run_performance_comparison(self, max_threads: int = 8,
+                                   executor: Optional[str] = None):
+        """Compare performance across different thread counts.
+        
+        Defaults to threads for the list backend and processes for the numpy
+        backend, whose baseline is the vectorized single-core sum.
+        """
+        executor = executor or ("processes" if self.backend == "numpy" else "threads")
         print("\n" + "="*60)
-        print("📊 PERFORMANCE COMPARISON")
+        print(f"📊 PERFORMANCE COMPARISON ({executor})")
         print("="*60)
         
         # Single-threaded baseline
-        _, single_time = self.single_threaded_sum()
+        _, single_time = self._baseline_sum()
         
         thread_counts = [2, 4, 6, 8] if max_threads >= 8 else list(range(2, max_threads + 1))
         times = []
         speedups = []
         
-        print(f"\n📈 Testing with different thread counts:")
+        print(f"\n📈 Testing with different numbers of {executor}:")
         print("-" * 40)
         
         for num_threads in thread_counts:
-            _, multi_time = self.optimal_multi_threaded_sum(num_threads)
+            _, multi_time = self.optimal_multi_threaded_sum(num_threads, executor)
             speedup = single_time / multi_time
             
             times.append(multi_time)
             speedups.append(speedup)
             
-            print(f"   {num_threads} threads: {speedup:.2f}x speedup")
+            print(f"   {num_threads} {executor}: {speedup:.2f}x speedup")
         
         return thread_counts, times, speedups, single_time
 
+    def _baseline_sum(self) -> Tuple[int, float]:
+        # Vectorized single core, not the Python loop, is what NumPy workers must beat
+        if self.backend == "numpy":
+            return self.vectorized_sum()
+        return self.single_threaded_sum()
+
+    def run_scaling_table(self, executors: Optional[List[str]] = None,
+                          worker_counts: Optional[List[int]] = None,
+                          json_path: Optional[str] = None) -> Dict:
+        """Speedup and parallel efficiency per executor and worker count.
+        
+        Executors this Python lacks are skipped. The report, with the machine
+        details needed to compare runs, is returned and, if json_path is
+        given, also written there.
+        """
+        executors = [e for e in (executors or EXECUTORS) if e in available_executors()]
+        cores = os.cpu_count() or 1
+        worker_counts = worker_counts or sorted({n for n in (1, 2, 4, 8, 16, 32, 64) if n <= cores} | {cores})
+        
+        print("\n" + "="*60)
+        print("📊 EXECUTOR SCALING TABLE")
+        print("="*60)
+        _, single_time = self._baseline_sum()
+        
+        rows = []
+        for executor in executors:
+            for num_workers in worker_counts:
+                _, multi_time = self.optimal_multi_threaded_sum(num_workers, executor)
+                speedup = single_time / multi_time
+                rows.append({
+                    "executor": executor,
+                    "workers": num_workers,
+                    "seconds": multi_time,
+                    "speedup": speedup,
+                    "efficiency": speedup / num_workers
+                })
+        
+        print(f"\nBaseline: {single_time:.4f}s on one core | {cores} cores | "
+              f"GIL {'enabled' if gil_enabled() else 'disabled (free-threaded)'}")
+        print(f"{'Executor':<14}{'Workers':>8}{'Time':>12}{'Speedup':>10}{'Efficiency':>12}")
+        print("-" * 56)
+        for row in rows:
+            print(f"{row['executor']:<14}{row['workers']:>8}{row['seconds']:>11.4f}s"
+                  f"{row['speedup']:>9.2f}x{row['efficiency']:>11.0%}")
+        
+        report = {
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "gil_enabled": gil_enabled(),
+            "cpu_count": cores,
+            "array_size": self.array_size,
+            "backend": self.backend,
+            "baseline_seconds": single_time,
+            "results": rows
+        }
+        if json_path:
+            with open(json_path, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"\n💾 Saved scaling table to {json_path}")
+        return report
+
     def demonstrate_race_conditions(self, iterations: int = 5):
         """Show how race conditions produce inconsistent results."""
         print("\n" + "="*60)
@@ -230,6 +422,97 @@ class ArraySumLab:
         else:
             print("   ⚠️  Race condition may not be visible (try larger array or more iterations)")
 
+def write_int32_file(path: str, num_values: int, chunk_values: int = 4 * 1024 * 1024,
+                     seed: int = 0) -> Dict[str, int]:
+    """Write random int32 values in chunks and return their sum, min and max."""
+    rng = np.random.default_rng(seed)
+    stats = {"sum": 0, "min": 100, "max": 1}
+    with open(path, "wb") as f:
+        for start in range(0, num_values, chunk_values):
+            chunk = rng.integers(1, 101, size=min(chunk_values, num_values - start), dtype=np.int32)
+            chunk.tofile(f)
+            stats["sum"] += int(chunk.sum(dtype=np.int64))
+            stats["min"] = min(stats["min"], int(chunk.min()))
+            stats["max"] = max(stats["max"], int(chunk.max()))
+    return stats
+
+def stream_reduce_file(path: str, reducer: str = "sum", num_workers: Optional[int] = None,
+                       chunk_bytes: int = 16 * 1024 * 1024, bins: int = 10,
+                       value_range: Tuple[int, int] = (1, 101)) -> Dict:
+    """Reduce a binary int32 file of any size with a process pool.
+    
+    The file is cut into fixed-size chunks; each task maps one chunk, reduces
+    it and unmaps it, so memory use depends on chunk_bytes and the number of
+    workers, never on the file size. reducer is "sum", "min", "max" or
+    "histogram" (bins equal-width buckets over value_range). Workers are
+    started before timing, so seconds and gb_per_second cover the reads and
+    reductions only.
+    """
+    file_size = os.path.getsize(path)
+    if file_size == 0 or file_size % 4:
+        raise ValueError(f"{path} is not a non-empty file of int32 values")
+    
+    # Mapping offsets must be multiples of the allocation granularity
+    granularity = mmap.ALLOCATIONGRANULARITY
+    chunk_bytes = max(granularity, chunk_bytes // granularity * granularity)
+    offsets = list(range(0, file_size, chunk_bytes))
+    lengths = [min(chunk_bytes, file_size - offset) for offset in offsets]
+    num_workers = num_workers or os.cpu_count() or 1
+    
+    with concurrent.futures.ProcessPoolExecutor(max_workers=num_workers,
+                                                initializer=array_sum_workers.load_numpy) as executor:
+        # Warm-up: start every worker and import numpy before the clock starts,
+        # as _pool_sum does, so GB/s measures the reduction itself
+        warm_up = [executor.submit(array_sum_workers.peak_rss_bytes) for _ in range(num_workers)]
+        concurrent.futures.wait(warm_up)
+        
+        start_time = time.perf_counter()
+        futures = [executor.submit(array_sum_workers.reduce_file_chunk, path, offset, length,
+                                   reducer, bins, value_range)
+                   for offset, length in zip(offsets, lengths)]
+        outcomes = [future.result() for future in futures]
+        execution_time = time.perf_counter() - start_time
+    
+    result = reduce(lambda a, b: array_sum_workers.combine(reducer, a, b),
+                    (partial for partial, _ in outcomes))
+    return {
+        "result": result,
+        "seconds": execution_time,
+        "gb_per_second": file_size / execution_time / 1e9,
+        "chunks": len(offsets),
+        "peak_worker_rss": max(peak for _, peak in outcomes)
+    }
+
+def run_streaming_benchmark(sizes_mb: Tuple[int, ...] = (64, 256, 1024),
+                            num_workers: Optional[int] = None) -> List[Dict]:
+    """Run every reducer over growing files; worker RSS should not grow with them."""
+    print("\n" + "="*60)
+    print("💽 STREAMING REDUCTIONS OVER MEMORY-MAPPED FILES")
+    print("="*60)
+    print("(files were just written, so reads come mostly from the page cache)")
+    print(f"{'File':>8}  {'Reducer':<10}{'Time':>10}{'GB/s':>8}{'Peak worker RSS':>18}  Correct?")
+    print("-" * 66)
+    
+    rows = []
+    for size_mb in sizes_mb:
+        fd, path = tempfile.mkstemp(suffix=".int32")
+        os.close(fd)
+        try:
+            expected = write_int32_file(path, size_mb * 1024 * 1024 // 4)
+            for reducer in ("sum", "min", "max", "histogram"):
+                stats = stream_reduce_file(path, reducer, num_workers)
+                if reducer == "histogram":
+                    correct = int(stats["result"].sum()) == size_mb * 1024 * 1024 // 4
+                else:
+                    correct = stats["result"] == expected[reducer]
+                rows.append(dict(stats, size_mb=size_mb, reducer=reducer, correct=correct))
+                print(f"{size_mb:>6}MB  {reducer:<10}{stats['seconds']:>9.3f}s"
+                      f"{stats['gb_per_second']:>8.2f}{stats['peak_worker_rss'] / 2**20:>15.1f} MB"
+                      f"  {'✅' if correct else '❌'}")
+        finally:
+            os.remove(path)
+    return rows
+
 def plot_performance_results(thread_counts: List[int], times: List[float], 
                            speedups: List[float], single_time: float):
     """Create visualization of performance results."""
@@ -268,8 +551,9 @@ def run_complete_lab():
     print("This lab demonstrates threading concepts, race conditions, and performance.")
     print()
     
-    # Create lab instance
-    lab = ArraySumLab(array_size=100000000)  # 100 million elements
+    # Create lab instance: a 100-million-element Python list takes minutes
+    # and gigabytes to build, so the big run uses the shared NumPy array
+    lab = ArraySumLab(array_size=100000000, backend="numpy")  # 100 million elements
     
     # Part 1: Basic comparison
     print("\n" + "="*60)
@@ -293,15 +577,22 @@ def run_complete_lab():
     print("Comparing synchronized vs unsynchronized access:")
     lab.multi_threaded_sum_safe(4)
     
-    # Part 4: Performance analysis
+    # Part 4: Performance analysis across cores
     thread_counts, times, speedups, single_time = lab.run_performance_comparison()
     
+    # Part 6 runs before the plot so the shared memory can be released
+    lab.run_scaling_table()
+    lab.close()
+    
     # Part 5: Visualize results (optional)
     try:
         plot_performance_results(thread_counts, times, speedups, single_time)
     except ImportError:
         print("\n⚠️  Matplotlib not available - skipping visualization")
     
+    # Part 7: Files larger than memory, streamed through a worker pool
+    run_streaming_benchmark()
+    
     print("\n" + "="*60)
     print("🎓 LAB COMPLETE - KEY LEARNING POINTS")
     print("="*60)
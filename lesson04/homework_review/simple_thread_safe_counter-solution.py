@@ -19,22 +19,25 @@ class UnsafeCounter:
     This shows the same problem you saw in the Array Sum lab.
     """
     
-    def __init__(self):
+    def __init__(self, delay=0.0001):
         self.value = 0
         self.operations_count = 0
+        self.delay = delay  # 0 turns off the simulated processing time
     
     def increment(self):
         """Increment counter by 1."""
         # RACE CONDITION: These steps can be interrupted by other threads
         temp = self.value
-        time.sleep(0.0001)  # Simulate some processing time
+        if self.delay:
+            time.sleep(self.delay)  # Simulate some processing time
         self.value = temp + 1
         self.operations_count += 1
     
     def decrement(self):
         """Decrement counter by 1."""
         temp = self.value
-        time.sleep(0.0001)  # Simulate some processing time  
+        if self.delay:
+            time.sleep(self.delay)  # Simulate some processing time  
         self.value = temp - 1
         self.operations_count += 1
     
@@ -56,22 +59,25 @@ class ThreadSafeCounter:
     YOUR TASK: Make this counter thread-safe using locks.
     """
     
-    def __init__(self):
+    def __init__(self, delay=0.0001):
         self.value = 0
         self.operations_count = 0
+        self.delay = delay
         self._lock = threading.Lock() 
     
     def increment(self):
         with self._lock:
             temp = self.value
-            time.sleep(0.0001)  # Same delay as unsafe version
+            if self.delay:
+                time.sleep(self.delay)  # Same delay as unsafe version
             self.value = temp + 1
             self.operations_count += 1
     
     def decrement(self):
         with self._lock:
             temp = self.value
-            time.sleep(0.0001)
+            if self.delay:
+                time.sleep(self.delay)
             self.value = temp - 1
             self.operations_count += 1
     
@@ -82,6 +88,145 @@ class ThreadSafeCounter:
         self.value = 0
         self.operations_count = 0
 
+# ============================================================================
+# PART 2b: Contention-Free Counters
+# ============================================================================
+
+class ShardedCounter:
+    """
+    LongAdder-style counter: every thread updates its own cell, reads add
+    up all cells.
+    
+    Only the owning thread ever writes a cell, so increment and decrement
+    take no lock at all. The lock is only held to register a new thread's
+    cell and to copy the cell list when reading. Cells of threads that have
+    exited are folded into a base total at those points, so the cell list
+    stays as long as the number of live threads, not every thread ever seen.
+    """
+    
+    def __init__(self):
+        self._local = threading.local()
+        self._cells = []  # one (thread, [value, operations]) pair per live thread
+        self._base = [0, 0]  # totals folded in from threads that have exited
+        self._cells_lock = threading.Lock()
+    
+    def _cell(self):
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = [0, 0]
+            with self._cells_lock:
+                self._fold_dead_cells()
+                self._cells.append((threading.current_thread(), cell))
+            self._local.cell = cell
+            return cell
+    
+    def _fold_dead_cells(self):
+        """Move exited threads' counts into the base (call with the lock held)."""
+        live = []
+        for thread, cell in self._cells:
+            if thread.is_alive():
+                live.append((thread, cell))
+            else:
+                # The thread can no longer write its cell, so this is exact
+                self._base[0] += cell[0]
+                self._base[1] += cell[1]
+        self._cells = live
+    
+    def _totals(self):
+        with self._cells_lock:
+            self._fold_dead_cells()
+            base = list(self._base)
+            cells = [cell for _, cell in self._cells]
+        return (base[0] + sum(cell[0] for cell in cells),
+                base[1] + sum(cell[1] for cell in cells))
+    
+    def increment(self):
+        cell = self._cell()
+        cell[0] += 1
+        cell[1] += 1
+    
+    def decrement(self):
+        cell = self._cell()
+        cell[0] -= 1
+        cell[1] += 1
+    
+    def get_value(self):
+        return self._totals()[0]
+    
+    @property
+    def operations_count(self):
+        return self._totals()[1]
+    
+    def reset(self):
+        """Zero every cell (only exact when no thread is updating)."""
+        with self._cells_lock:
+            self._base = [0, 0]
+            for _, cell in self._cells:
+                cell[0] = cell[1] = 0
+
+class BatchedCounter:
+    """
+    Counter that accumulates changes per thread and publishes them to the
+    shared value every flush_every operations or flush_interval seconds.
+    
+    The shared lock is taken once per batch instead of once per operation.
+    get_value() only sees published changes, so it can lag by up to one
+    batch per thread; call flush() when a thread finishes its work.
+    """
+    
+    def __init__(self, flush_every=256, flush_interval=0.01):
+        self.value = 0
+        self.operations_count = 0
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    def _state(self):
+        # [pending delta, pending operations, next flush deadline]
+        try:
+            return self._local.state
+        except AttributeError:
+            state = self._local.state = [0, 0, time.monotonic() + self.flush_interval]
+            return state
+    
+    def _record(self, change):
+        state = self._state()
+        state[0] += change
+        state[1] += 1
+        if state[1] >= self.flush_every:
+            self._publish(state)
+        elif state[1] % 32 == 0 and time.monotonic() >= state[2]:
+            self._publish(state)  # reading the clock every op would cost more than the lock
+    
+    def _publish(self, state):
+        with self._lock:
+            self.value += state[0]
+            self.operations_count += state[1]
+        state[0] = state[1] = 0
+        state[2] = time.monotonic() + self.flush_interval
+    
+    def increment(self):
+        self._record(1)
+    
+    def decrement(self):
+        self._record(-1)
+    
+    def flush(self):
+        """Publish the calling thread's pending changes now."""
+        state = self._state()
+        if state[1]:
+            self._publish(state)
+    
+    def get_value(self):
+        return self.value
+    
+    def reset(self):
+        with self._lock:
+            self.value = 0
+            self.operations_count = 0
+
 # ============================================================================
 # PART 3: Testing Framework
 # ============================================================================
@@ -91,6 +236,9 @@ def test_counter(counter, num_threads=4, operations_per_thread=1000):
     Test a counter with multiple threads and compute the true expected value
     based on actual increments/decrements performed.
     
+    The random operations are drawn before the clock starts. To time only
+    the counter itself, pass one built with delay=0.
+    
     Args:
         counter: Counter instance to test
         num_threads: Number of threads to create
@@ -103,25 +251,28 @@ def test_counter(counter, num_threads=4, operations_per_thread=1000):
     
     results = []  # will hold (increments, decrements) tuples from each thread
     results_lock = threading.Lock()  # to protect access to results list
+    start_barrier = threading.Barrier(num_threads + 1)
     
     def worker():
         """Each thread runs this function."""
         local_increments = 0
         local_decrements = 0
-        for _ in range(operations_per_thread):
-            if random.random() < 0.7:  # 70% increments, 30% decrements
+        # 70% increments, 30% decrements
+        operations = [random.random() < 0.7 for _ in range(operations_per_thread)]
+        start_barrier.wait()
+        for is_increment in operations:
+            if is_increment:
                 counter.increment()
                 local_increments += 1
             else:
                 counter.decrement()
                 local_decrements += 1
+        if hasattr(counter, 'flush'):
+            counter.flush()  # publish whatever this thread still holds
         # Safely record local counts
         with results_lock:
             results.append((local_increments, local_decrements))
     
-    # Start timing
-    start_time = time.time()
-    
     # Create and start all threads
     threads = []
     for _ in range(num_threads):
@@ -129,6 +280,10 @@ def test_counter(counter, num_threads=4, operations_per_thread=1000):
         threads.append(thread)
         thread.start()
     
+    # Start timing once every thread is ready
+    start_barrier.wait()
+    start_time = time.time()
+    
     # Wait for all threads to finish
     for thread in threads:
         thread.join()
@@ -218,6 +373,36 @@ def run_performance_comparison():
         
         print("This is the trade-off between CORRECTNESS and PERFORMANCE")
 
+def run_throughput_comparison(thread_counts=(1, 2, 4, 8, 16, 32, 64), operations_per_thread=20000):
+    """Measure true ops/sec (no artificial sleep) for each counter type."""
+    print("\n🚀 COUNTER THROUGHPUT (no simulated work)")
+    print("=" * 50)
+    
+    counter_types = {
+        "Unsafe": lambda: UnsafeCounter(delay=0),
+        "Lock per op": lambda: ThreadSafeCounter(delay=0),
+        "Sharded": ShardedCounter,
+        "Batched": BatchedCounter,
+    }
+    
+    header = f"{'Threads':>8}" + "".join(f"{name:>16}" for name in counter_types)
+    print(header + "   (ops/sec, ❌ = wrong total)")
+    print("-" * len(header))
+    
+    results = {}
+    for num_threads in thread_counts:
+        row = f"{num_threads:>8}"
+        for name, counter_type in counter_types.items():
+            _, _, exec_time, is_correct = test_counter(
+                counter_type(), num_threads, operations_per_thread
+            )
+            ops_per_second = num_threads * operations_per_thread / exec_time
+            results[(name, num_threads)] = (ops_per_second, is_correct)
+            row += f"{ops_per_second:>15,.0f}{' ' if is_correct else '❌'}"
+        print(row)
+    
+    return results
+
 # ============================================================================
 # PART 4: Main Assignment Runner
 # ============================================================================
@@ -235,5 +420,8 @@ def main():
     # Part 2: Compare solutions  
     run_performance_comparison()
     
+    # Part 3: Counters that avoid a shared lock, without the sleep
+    run_throughput_comparison()
+    
 if __name__ == "__main__":
     main()
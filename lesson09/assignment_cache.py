@@ -1,7 +1,19 @@
+import os
+import sys
+import asyncio
+import json
+import mmap
 import time
+import struct
+import tempfile
+import tracemalloc
+import zlib
 import random
+import threading
+import concurrent.futures
+from abc import ABC, abstractmethod
 from collections import OrderedDict
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Callable, Tuple
 
 class Database:
     """Simulates a slow database"""
@@ -17,97 +29,1404 @@ class Database:
             for i in range(200)
         }
         self.query_count = 0
+        self._stats_lock = threading.Lock()
     
     def get_user(self, user_id: str) -> Optional[Dict]:
         """Get user data (slow operation)"""
-        self.query_count += 1
+        with self._stats_lock:
+            self.query_count += 1
         time.sleep(0.005)  # Simulate 5ms database query
         return self.users.get(user_id)
     
+    def get_users(self, user_ids: List[str]) -> Dict[str, Optional[Dict]]:
+        """Get many users in one query (one round trip, like WHERE id IN (...))"""
+        with self._stats_lock:
+            self.query_count += 1
+        time.sleep(0.005)  # Same round trip cost as a single lookup
+        return {user_id: self.users.get(user_id) for user_id in user_ids}
+    
     def reset_stats(self):
         self.query_count = 0
 
-class LRUCache:
-    """Least Recently Used cache implementation"""
+class VariableSizeDatabase(Database):
+    """Database whose profiles range from tens of bytes to ~1 MB (log-normal)
+    
+    Like a real driver, every query builds a fresh object, so cached profiles
+    own their memory instead of sharing it with Database.users.
+    """
+    
+    def __init__(self, max_repeat: int = 40000):
+        super().__init__()
+        sizes = random.Random(42)
+        for user in self.users.values():
+            user['repeat'] = min(max_repeat, int(sizes.lognormvariate(6, 1.5)) + 1)
+    
+    def _materialize(self, user_id: str, user: Optional[Dict]) -> Optional[Dict]:
+        if user is None:
+            return None
+        return {
+            'name': user['name'],
+            'email': user['email'],
+            'data': f'Profile data for {user_id} ' * user['repeat']
+        }
+    
+    def get_user(self, user_id: str) -> Optional[Dict]:
+        return self._materialize(user_id, super().get_user(user_id))
+    
+    def get_users(self, user_ids: List[str]) -> Dict[str, Optional[Dict]]:
+        users = super().get_users(user_ids)
+        return {user_id: self._materialize(user_id, user) for user_id, user in users.items()}
+
+def deep_getsizeof(obj, seen: Optional[set] = None) -> int:
+    """Estimate the bytes held by obj, following containers and instance dicts"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_getsizeof(k, seen) + deep_getsizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_getsizeof(item, seen) for item in obj)
+    elif hasattr(obj, '__dict__'):
+        size += deep_getsizeof(vars(obj), seen)
+    return size
+
+class LatencyHistogram:
+    """HDR-style histogram of latencies in microseconds
+    
+    Values below 2**sub_bucket_bits are counted exactly; above that each power
+    of two is split into 2**(sub_bucket_bits - 1) linear buckets, so every
+    recorded value keeps a relative error under 2**-(sub_bucket_bits - 1)
+    (about 6% with the default) in constant memory.
+    """
+    
+    def __init__(self, sub_bucket_bits: int = 5):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_bucket_count = 1 << sub_bucket_bits
+        self.half_count = self.sub_bucket_count // 2
+        self.counts: List[int] = [0] * self.sub_bucket_count
+        self.total = 0
+        self.sum = 0
+        self.max = 0
+        self._lock = threading.Lock()
+    
+    def _index(self, value: int) -> int:
+        if value < self.sub_bucket_count:
+            return value
+        shift = value.bit_length() - self.sub_bucket_bits
+        return self.sub_bucket_count + (shift - 1) * self.half_count + (value >> shift) - self.half_count
+    
+    def _bucket_value(self, index: int) -> int:
+        """Highest value that lands in a bucket"""
+        if index < self.sub_bucket_count:
+            return index
+        shift, offset = divmod(index - self.sub_bucket_count, self.half_count)
+        shift += 1
+        return ((offset + self.half_count + 1) << shift) - 1
+    
+    def record(self, seconds: float):
+        value = int(seconds * 1_000_000)
+        index = self._index(value)
+        with self._lock:
+            if index >= len(self.counts):
+                self.counts.extend([0] * (index + 1 - len(self.counts)))
+            self.counts[index] += 1
+            self.total += 1
+            self.sum += value
+            self.max = max(self.max, value)
+    
+    def percentile(self, pct: float) -> int:
+        """Latency (microseconds) at or below which pct percent of samples fall"""
+        target = max(1, int(round(pct / 100 * self.total)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self._bucket_value(index), self.max)
+        return self.max
+    
+    def summary(self) -> Dict:
+        with self._lock:
+            return {
+                'count': self.total,
+                'mean_us': self.sum / self.total if self.total else 0,
+                'p50_us': self.percentile(50),
+                'p90_us': self.percentile(90),
+                'p99_us': self.percentile(99),
+                'p999_us': self.percentile(99.9),
+                'max_us': self.max
+            }
+
+class SpaceSaving:
+    """Top-k heavy hitters with the space-saving algorithm
+    
+    Tracks at most k keys. An untracked key replaces the key with the smallest
+    count and inherits that count (recorded as its possible overestimate), so
+    any key requested more than total/k times is guaranteed to be tracked.
+    """
+    
+    def __init__(self, k: int):
+        self.k = k
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+    
+    def add(self, key: str):
+        if key in self.counts:
+            self.counts[key] += 1
+        elif len(self.counts) < self.k:
+            self.counts[key] = 1
+            self.errors[key] = 0
+        else:
+            victim = min(self.counts, key=self.counts.get)
+            floor = self.counts.pop(victim)
+            del self.errors[victim]
+            self.counts[key] = floor + 1
+            self.errors[key] = floor
+    
+    def top(self, n: Optional[int] = None) -> List[Tuple[str, int, int]]:
+        """(key, estimated count, maximum overestimate), most frequent first"""
+        counts = dict(self.counts)
+        errors = dict(self.errors)
+        ranked = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:n or self.k]
+        return [(key, count, errors.get(key, 0)) for key, count in ranked]
+
+class EvictionPolicy(ABC):
+    """Decides which keys a cache keeps once it is full"""
     
     def __init__(self, capacity: int):
         self.capacity = capacity
-        self.cache = OrderedDict()
+    
+    @abstractmethod
+    def record_access(self, key: str):
+        """Called when a resident key is read or updated"""
+        pass
+    
+    @abstractmethod
+    def record_insert(self, key: str) -> List[str]:
+        """Track a new key and return the keys evicted to make room
+        
+        The returned list may contain the new key itself if the policy
+        refuses to admit it.
+        """
+        pass
+    
+    @abstractmethod
+    def remove(self, key: str):
+        """Forget a key the cache dropped on its own (e.g. expired)"""
+        pass
+    
+    @abstractmethod
+    def evict(self) -> Optional[str]:
+        """Pick and forget one resident key; used when a size budget is exceeded"""
+        pass
+    
+    @abstractmethod
+    def ordered_keys(self) -> List[str]:
+        """Resident keys from next-to-evict to most valuable"""
+        pass
+
+class LRUPolicy(EvictionPolicy):
+    """Evicts the least recently used key"""
+    
+    def __init__(self, capacity: int):
+        super().__init__(capacity)
+        self.order = OrderedDict()
+    
+    def record_access(self, key: str):
+        self.order.move_to_end(key)
+    
+    def record_insert(self, key: str) -> List[str]:
+        self.order[key] = None
+        if len(self.order) > self.capacity:
+            victim, _ = self.order.popitem(last=False)
+            return [victim]
+        return []
+    
+    def remove(self, key: str):
+        self.order.pop(key, None)
+    
+    def evict(self) -> Optional[str]:
+        if not self.order:
+            return None
+        victim, _ = self.order.popitem(last=False)
+        return victim
+    
+    def ordered_keys(self) -> List[str]:
+        return list(self.order)
+
+class CountMinSketch:
+    """Approximate per-key frequency counts in fixed memory
+    
+    Counters saturate at 15 and are halved every sample_size increments, so old
+    popularity fades and the sketch tracks recent frequency.
+    """
+    
+    MAX_COUNT = 15
+    
+    def __init__(self, width: int, depth: int = 4, sample_size: int = 1000):
+        self.width = width
+        self.seeds = [random.getrandbits(32) for _ in range(depth)]
+        self.tables = [[0] * width for _ in range(depth)]
+        self.sample_size = sample_size
+        self.additions = 0
+    
+    def _indexes(self, key: str) -> List[int]:
+        return [hash((seed, key)) % self.width for seed in self.seeds]
+    
+    def increment(self, key: str):
+        for table, index in zip(self.tables, self._indexes(key)):
+            if table[index] < self.MAX_COUNT:
+                table[index] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self._age()
+    
+    def estimate(self, key: str) -> int:
+        return min(table[index] for table, index in zip(self.tables, self._indexes(key)))
+    
+    def _age(self):
+        for table in self.tables:
+            for i in range(self.width):
+                table[i] >>= 1
+        self.additions //= 2
+
+class TinyLFUPolicy(EvictionPolicy):
+    """W-TinyLFU: a small LRU window in front of a frequency-filtered main area
+    
+    New keys enter the window. A key leaving the window only enters the main
+    segmented LRU if the sketch says it is requested more often than the main
+    area's victim, so a one-off scan cannot flush the hot set.
+    """
+    
+    def __init__(self, capacity: int, window_fraction: float = 0.01):
+        super().__init__(capacity)
+        self.window_capacity = max(1, int(capacity * window_fraction))
+        self.main_capacity = capacity - self.window_capacity
+        self.protected_capacity = int(self.main_capacity * 0.8)
+        self.window = OrderedDict()
+        self.probation = OrderedDict()
+        self.protected = OrderedDict()
+        self.sketch = CountMinSketch(width=max(64, capacity * 8), sample_size=max(100, capacity * 10))
+    
+    def record_access(self, key: str):
+        self.sketch.increment(key)
+        if key in self.window:
+            self.window.move_to_end(key)
+        elif key in self.probation:
+            # A second hit promotes the key into the protected segment
+            del self.probation[key]
+            self.protected[key] = None
+            if len(self.protected) > self.protected_capacity:
+                demoted, _ = self.protected.popitem(last=False)
+                self.probation[demoted] = None
+        else:
+            self.protected.move_to_end(key)
+    
+    def record_insert(self, key: str) -> List[str]:
+        self.sketch.increment(key)
+        self.window[key] = None
+        if len(self.window) <= self.window_capacity:
+            return []
+        
+        candidate, _ = self.window.popitem(last=False)
+        if len(self.probation) + len(self.protected) < self.main_capacity:
+            self.probation[candidate] = None
+            return []
+        if self.main_capacity == 0:
+            return [candidate]
+        
+        # Admission filter: candidate must be more popular than the main victim
+        victim_segment = self.probation if self.probation else self.protected
+        victim = next(iter(victim_segment))
+        if self.sketch.estimate(candidate) > self.sketch.estimate(victim):
+            del victim_segment[victim]
+            self.probation[candidate] = None
+            return [victim]
+        return [candidate]
+    
+    def remove(self, key: str):
+        for segment in (self.window, self.probation, self.protected):
+            if segment.pop(key, 0) is None:
+                return
+    
+    def evict(self) -> Optional[str]:
+        # Least valuable first: probation, then protected, then the window
+        for segment in (self.probation, self.protected, self.window):
+            if segment:
+                victim, _ = segment.popitem(last=False)
+                return victim
+        return None
+    
+    def ordered_keys(self) -> List[str]:
+        return list(self.probation) + list(self.protected) + list(self.window)
+
+class ARCPolicy(EvictionPolicy):
+    """Adaptive Replacement Cache (Megiddo & Modha)
+    
+    T1 holds keys seen once recently, T2 keys seen at least twice. B1 and B2
+    remember recently evicted keys, and hits on them shift the target size p
+    of T1 toward whichever list would have kept the key.
+    """
+    
+    def __init__(self, capacity: int):
+        super().__init__(capacity)
+        self.p = 0
+        self.t1 = OrderedDict()
+        self.t2 = OrderedDict()
+        self.b1 = OrderedDict()
+        self.b2 = OrderedDict()
+    
+    def record_access(self, key: str):
+        if key in self.t1:
+            del self.t1[key]
+            self.t2[key] = None
+        else:
+            self.t2.move_to_end(key)
+    
+    def _replace(self, in_b2: bool) -> List[str]:
+        """Evict from T1 or T2 into the matching ghost list if the cache is full"""
+        if len(self.t1) + len(self.t2) < self.capacity:
+            return []
+        return [self._evict_one(in_b2)]
+    
+    def _evict_one(self, in_b2: bool) -> str:
+        if self.t1 and (len(self.t1) > self.p or (in_b2 and len(self.t1) == self.p) or not self.t2):
+            victim, _ = self.t1.popitem(last=False)
+            self.b1[victim] = None
+        else:
+            victim, _ = self.t2.popitem(last=False)
+            self.b2[victim] = None
+        return victim
+    
+    def record_insert(self, key: str) -> List[str]:
+        if key in self.b1:
+            # Recently evicted from T1: favour recency
+            self.p = min(self.capacity, self.p + max(len(self.b2) // len(self.b1), 1))
+            evicted = self._replace(in_b2=False)
+            del self.b1[key]
+            self.t2[key] = None
+            return evicted
+        
+        if key in self.b2:
+            # Recently evicted from T2: favour frequency
+            self.p = max(0, self.p - max(len(self.b1) // len(self.b2), 1))
+            evicted = self._replace(in_b2=True)
+            del self.b2[key]
+            self.t2[key] = None
+            return evicted
+        
+        evicted = []
+        l1_size = len(self.t1) + len(self.b1)
+        total_size = l1_size + len(self.t2) + len(self.b2)
+        if l1_size >= self.capacity:
+            if len(self.t1) < self.capacity:
+                self.b1.popitem(last=False)
+                evicted = self._replace(in_b2=False)
+            else:
+                victim, _ = self.t1.popitem(last=False)
+                evicted = [victim]
+        elif total_size >= self.capacity:
+            if total_size >= 2 * self.capacity:
+                self.b2.popitem(last=False)
+            evicted = self._replace(in_b2=False)
+        
+        self.t1[key] = None
+        return evicted
+    
+    def remove(self, key: str):
+        self.t1.pop(key, None)
+        self.t2.pop(key, None)
+    
+    def evict(self) -> Optional[str]:
+        if not self.t1 and not self.t2:
+            return None
+        return self._evict_one(in_b2=False)
+    
+    def ordered_keys(self) -> List[str]:
+        return list(self.t1) + list(self.t2)
+
+SNAPSHOT_MAGIC = b'LRUS'
+SNAPSHOT_HEADER = struct.Struct('<4sBBI')  # magic, version, has values, entry count
+
+def write_snapshot(path: str, entries: List[Tuple[str, Optional[Dict]]], include_values: bool):
+    """Write (key, value) pairs, oldest first, to a compact binary file
+    
+    Keys are length-prefixed UTF-8; values, when included, are length-prefixed
+    JSON. The file is written next to the target and renamed into place so a
+    crash mid-write never leaves a truncated snapshot.
+    """
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, 1, int(include_values), len(entries)))
+        for key, value in entries:
+            key_bytes = key.encode('utf-8')
+            f.write(struct.pack('<H', len(key_bytes)) + key_bytes)
+            if include_values:
+                value_bytes = json.dumps(value).encode('utf-8')
+                f.write(struct.pack('<I', len(value_bytes)) + value_bytes)
+    os.replace(temp_path, path)
+
+def read_snapshot(path: str) -> List[Tuple[str, Optional[Dict]]]:
+    """Read a snapshot back as (key, value) pairs; value is None if not stored"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, version, has_values, count = SNAPSHOT_HEADER.unpack_from(data, 0)
+    if magic != SNAPSHOT_MAGIC or version != 1:
+        raise ValueError(f"{path} is not a cache snapshot")
+    
+    entries = []
+    offset = SNAPSHOT_HEADER.size
+    for _ in range(count):
+        (key_length,) = struct.unpack_from('<H', data, offset)
+        offset += 2
+        key = data[offset:offset + key_length].decode('utf-8')
+        offset += key_length
+        value = None
+        if has_values:
+            (value_length,) = struct.unpack_from('<I', data, offset)
+            offset += 4
+            value = json.loads(data[offset:offset + value_length])
+            offset += value_length
+        entries.append((key, value))
+    return entries
+
+class LRUCache:
+    """Least Recently Used cache implementation
+    
+    Which key to evict is delegated to an EvictionPolicy; the default LRUPolicy
+    gives classic LRU behaviour, TinyLFUPolicy and ARCPolicy resist scans.
+    
+    Entries may carry a TTL. Expiry is lazy: an entry is only checked when it is
+    read. For stale_ttl seconds after expiring, an entry is still served but
+    reported as stale so the caller can reload it in the background
+    (stale-while-revalidate); after that it is dropped and counts as a miss.
+    
+    With max_bytes set, the cache is also bounded by the estimated size of its
+    values (from weigher, a deep sys.getsizeof walk by default), and evicts
+    until the total fits. capacity still caps the number of entries.
+    
+    on_evict(key, value) is called for every entry pushed out to make room,
+    e.g. to spill it into a second-tier cache.
+    
+    Evictions are counted by reason (capacity, ttl, explicit) and, with
+    track_hot_keys=k, the k most requested keys are tracked in a SpaceSaving
+    sketch.
+    """
+    
+    def __init__(self, capacity: int, policy: Optional[Callable[[int], EvictionPolicy]] = None,
+                 default_ttl: Optional[float] = None, stale_ttl: float = 0.0,
+                 max_bytes: Optional[int] = None, weigher: Optional[Callable[[Dict], int]] = None,
+                 on_evict: Optional[Callable[[str, Dict], None]] = None, track_hot_keys: int = 0):
+        self.capacity = capacity
+        self.cache = {}
+        self.policy = (policy or LRUPolicy)(capacity)
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.expires_at: Dict[str, float] = {}  # only keys that have a TTL
+        self.max_bytes = max_bytes
+        self.weigher = weigher or deep_getsizeof
+        self.weights: Dict[str, int] = {}  # only filled when max_bytes is set
+        self.total_bytes = 0
+        self.on_evict = on_evict
+        self.hot_keys = SpaceSaving(track_hot_keys) if track_hot_keys else None
+        self.evictions = {'capacity': 0, 'ttl': 0, 'explicit': 0}
         self.hits = 0
         self.misses = 0
+        self.stale_hits = 0
+        self.expirations = 0
+        self.refreshes = 0
     
     def get(self, key: str) -> Optional[Dict]:
         """Get item from cache"""
-        # TODO: Implement cache get logic
-        # If key exists: record hit, move to end, return value
-        # If key doesn't exist: record miss, return None
+        return self.get_with_state(key)[0]
+    
+    def peek(self, key: str) -> Optional[Dict]:
+        """Look up a key without touching stats, recency or expiry"""
+        expires_at = self.expires_at.get(key)
+        if expires_at is not None and time.monotonic() >= expires_at + self.stale_ttl:
+            return None
+        return self.cache.get(key)
+    
+    def get_with_state(self, key: str) -> Tuple[Optional[Dict], bool]:
+        """Get item from cache; returns (value, is_stale)"""
+        if self.hot_keys is not None:
+            self.hot_keys.add(key)
         
-        if key in self.cache:
-            # Cache hit - move to end and return
-            self.hits += 1
-            value = self.cache.pop(key)
-            self.cache[key] = value  # Move to end
-            return value
-        else:
+        if key not in self.cache:
             # Cache miss
             self.misses += 1
-            return None
+            return None, False
+        
+        is_stale = False
+        expires_at = self.expires_at.get(key)
+        if expires_at is not None:
+            now = time.monotonic()
+            if now >= expires_at + self.stale_ttl:
+                # Past the stale window - drop it and treat as a miss
+                self._remove(key)
+                self.expirations += 1
+                self.evictions['ttl'] += 1
+                self.misses += 1
+                return None, False
+            if now >= expires_at:
+                is_stale = True
+                self.stale_hits += 1
+        
+        # Cache hit - let the policy update its recency/frequency
+        self.hits += 1
+        self.policy.record_access(key)
+        return self.cache[key], is_stale
     
-    def put(self, key: str, value: Dict):
-        """Put item in cache"""
-        # TODO: Implement cache put logic
-        # If at capacity: remove oldest item first
-        # Add new item to end
+    def put(self, key: str, value: Dict, ttl: Optional[float] = None):
+        """Put item in cache, optionally expiring after ttl seconds"""
+        if self.max_bytes is not None:
+            weight = self.weigher(value)
+            if weight > self.max_bytes:
+                # Too big to ever fit - don't let it flush the whole cache
+                if key in self.cache:
+                    self._remove(key)
+                return
+            self.total_bytes += weight - self.weights.get(key, 0)
+            self.weights[key] = weight
+        
+        ttl = ttl if ttl is not None else self.default_ttl
+        if ttl is not None:
+            self.expires_at[key] = time.monotonic() + ttl
+        else:
+            self.expires_at.pop(key, None)
         
         if key in self.cache:
-            # Update existing - remove and re-add
-            self.cache.pop(key)
-        elif len(self.cache) >= self.capacity:
-            # Remove oldest (first item)
-            self.cache.popitem(last=False)
+            # Update existing
+            self.cache[key] = value
+            self.policy.record_access(key)
+        else:
+            # Add new item and drop whatever the policy evicted to make room
+            self.cache[key] = value
+            for evicted_key in self.policy.record_insert(key):
+                self._evict(evicted_key)
         
-        # Add to end (most recent)
-        self.cache[key] = value
+        # Keep evicting until the estimated size fits the byte budget
+        while self.max_bytes is not None and self.total_bytes > self.max_bytes:
+            evicted_key = self.policy.evict()
+            if evicted_key is None:
+                break
+            self._evict(evicted_key)
+    
+    def refresh(self, key: str, value: Dict, ttl: Optional[float] = None):
+        """Store a value reloaded by a background refresh"""
+        self.put(key, value, ttl)
+        self.refreshes += 1
+    
+    def get_many(self, keys: List[str]) -> Dict[str, Dict]:
+        """Look up several keys; returns only the ones that hit"""
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+    
+    def put_many(self, items: Dict[str, Dict], ttl: Optional[float] = None):
+        """Store several items"""
+        for key, value in items.items():
+            self.put(key, value, ttl)
+    
+    def snapshot_entries(self, include_values: bool = False) -> List[Tuple[str, Optional[Dict]]]:
+        """Resident entries in eviction order, least valuable first"""
+        return [(key, self.cache[key] if include_values else None)
+                for key in self.policy.ordered_keys()]
+    
+    def snapshot(self, path: str, include_values: bool = False) -> int:
+        """Save keys (and optionally values) for a warm restart"""
+        entries = self.snapshot_entries(include_values)
+        write_snapshot(path, entries, include_values)
+        return len(entries)
+    
+    def restore(self, path: str) -> List[str]:
+        """Reload a snapshot; returns keys saved without values, in order"""
+        missing = []
+        for key, value in read_snapshot(path):
+            if value is None:
+                missing.append(key)
+            else:
+                self.put(key, value)
+        return missing
+    
+    def _remove(self, key: str):
+        self._discard(key)
+        self.policy.remove(key)
+    
+    def _evict(self, key: str):
+        """Drop a key evicted for space and hand it to the eviction hook"""
+        value = self.cache[key]
+        self._discard(key)
+        self.evictions['capacity'] += 1
+        if self.on_evict is not None:
+            self.on_evict(key, value)
+    
+    def _discard(self, key: str):
+        """Drop a key the policy no longer tracks"""
+        del self.cache[key]
+        self.expires_at.pop(key, None)
+        self.total_bytes -= self.weights.pop(key, 0)
     
     def hit_ratio(self) -> float:
         """Calculate cache hit percentage"""
         total = self.hits + self.misses
         return (self.hits / total * 100) if total > 0 else 0
     
+    def delete(self, key: str) -> bool:
+        """Explicitly remove a key (e.g. after the user record changed)"""
+        if key not in self.cache:
+            return False
+        self._remove(key)
+        self.evictions['explicit'] += 1
+        return True
+    
+    def stats(self) -> Dict:
+        """Copy of the counters, safe to hand to a metrics exporter"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self.cache),
+            'evictions': dict(self.evictions),
+            'hot_keys': self.hot_keys.top() if self.hot_keys is not None else []
+        }
+    
     def clear_stats(self):
         """Reset hit/miss counters"""
         self.hits = 0
         self.misses = 0
+        self.stale_hits = 0
+        self.expirations = 0
+        self.refreshes = 0
+        self.evictions = {'capacity': 0, 'ttl': 0, 'explicit': 0}
+
+class ShardedLRUCache:
+    """Thread-safe LRU cache that spreads keys across independently locked shards
+    
+    Each shard is a plain LRUCache guarded by its own lock, so threads working on
+    keys in different shards never wait on each other. LRU order and hit/miss
+    stats are kept per shard; the public counters are sums over all shards.
+    Extra keyword arguments (policy, default_ttl, ...) configure every shard.
+    """
+    
+    def __init__(self, capacity: int, num_shards: int = 16, **cache_options):
+        self.capacity = capacity
+        self.num_shards = max(1, min(num_shards, capacity))
+        # The first capacity % num_shards shards get one extra slot, so the
+        # shard capacities add up to exactly capacity
+        base, extra = divmod(capacity, self.num_shards)
+        if cache_options.get('max_bytes') is not None:
+            # The byte budget is for the whole cache, not for each shard
+            cache_options['max_bytes'] //= self.num_shards
+        self.shards = [LRUCache(base + (1 if i < extra else 0), **cache_options)
+                       for i in range(self.num_shards)]
+        self.locks = [threading.Lock() for _ in range(self.num_shards)]
+    
+    def _shard_index(self, key: str) -> int:
+        return hash(key) % self.num_shards
+    
+    def get(self, key: str) -> Optional[Dict]:
+        """Get item from the shard that owns the key"""
+        index = self._shard_index(key)
+        with self.locks[index]:
+            return self.shards[index].get(key)
+    
+    def peek(self, key: str) -> Optional[Dict]:
+        """Look up a key in its shard without touching stats"""
+        index = self._shard_index(key)
+        with self.locks[index]:
+            return self.shards[index].peek(key)
+    
+    def get_with_state(self, key: str) -> Tuple[Optional[Dict], bool]:
+        """Get item and staleness from the shard that owns the key"""
+        index = self._shard_index(key)
+        with self.locks[index]:
+            return self.shards[index].get_with_state(key)
+    
+    def put(self, key: str, value: Dict, ttl: Optional[float] = None):
+        """Put item in the shard that owns the key"""
+        index = self._shard_index(key)
+        with self.locks[index]:
+            self.shards[index].put(key, value, ttl)
+    
+    def refresh(self, key: str, value: Dict, ttl: Optional[float] = None):
+        """Store a background-refreshed value in the shard that owns the key"""
+        index = self._shard_index(key)
+        with self.locks[index]:
+            self.shards[index].refresh(key, value, ttl)
+    
+    def delete(self, key: str) -> bool:
+        """Explicitly remove a key from the shard that owns it"""
+        index = self._shard_index(key)
+        with self.locks[index]:
+            return self.shards[index].delete(key)
+    
+    def stats(self) -> Dict:
+        """Counters summed over shards, read without taking shard locks
+        
+        Keys never span shards, so merging the per-shard hot-key sketches is
+        exact; values may be a few operations out of date.
+        """
+        shard_stats = [shard.stats() for shard in self.shards]
+        evictions = {reason: sum(stats['evictions'][reason] for stats in shard_stats)
+                     for reason in shard_stats[0]['evictions']}
+        hot_keys = sorted((entry for stats in shard_stats for entry in stats['hot_keys']),
+                          key=lambda entry: entry[1], reverse=True)
+        return {
+            'hits': sum(stats['hits'] for stats in shard_stats),
+            'misses': sum(stats['misses'] for stats in shard_stats),
+            'size': sum(stats['size'] for stats in shard_stats),
+            'evictions': evictions,
+            'hot_keys': hot_keys[:10]
+        }
+    
+    def _group_by_shard(self, keys) -> Dict[int, List[str]]:
+        groups: Dict[int, List[str]] = {}
+        for key in keys:
+            groups.setdefault(self._shard_index(key), []).append(key)
+        return groups
+    
+    def get_many(self, keys: List[str]) -> Dict[str, Dict]:
+        """Look up several keys, taking each shard lock once"""
+        found = {}
+        for index, shard_keys in self._group_by_shard(keys).items():
+            with self.locks[index]:
+                found.update(self.shards[index].get_many(shard_keys))
+        return found
+    
+    def put_many(self, items: Dict[str, Dict], ttl: Optional[float] = None):
+        """Store several items, taking each shard lock once"""
+        for index, shard_keys in self._group_by_shard(items).items():
+            with self.locks[index]:
+                self.shards[index].put_many({key: items[key] for key in shard_keys}, ttl)
+    
+    def snapshot(self, path: str, include_values: bool = False) -> int:
+        """Save every shard's entries; order is kept within each shard"""
+        entries = []
+        for lock, shard in zip(self.locks, self.shards):
+            with lock:
+                entries.extend(shard.snapshot_entries(include_values))
+        write_snapshot(path, entries, include_values)
+        return len(entries)
+    
+    def restore(self, path: str) -> List[str]:
+        """Reload a snapshot; returns keys saved without values, in order"""
+        missing = []
+        for key, value in read_snapshot(path):
+            if value is None:
+                missing.append(key)
+            else:
+                self.put(key, value)
+        return missing
+    
+    @property
+    def hits(self) -> int:
+        return sum(shard.hits for shard in self.shards)
+    
+    @property
+    def misses(self) -> int:
+        return sum(shard.misses for shard in self.shards)
+    
+    @property
+    def stale_hits(self) -> int:
+        return sum(shard.stale_hits for shard in self.shards)
+    
+    @property
+    def expirations(self) -> int:
+        return sum(shard.expirations for shard in self.shards)
+    
+    @property
+    def refreshes(self) -> int:
+        return sum(shard.refreshes for shard in self.shards)
+    
+    @property
+    def total_bytes(self) -> int:
+        return sum(shard.total_bytes for shard in self.shards)
+    
+    def hit_ratio(self) -> float:
+        """Calculate cache hit percentage across all shards"""
+        hits = self.hits
+        total = hits + self.misses
+        return (hits / total * 100) if total > 0 else 0
+    
+    def clear_stats(self):
+        """Reset hit/miss counters on every shard"""
+        for lock, shard in zip(self.locks, self.shards):
+            with lock:
+                shard.clear_stats()
+
+class DiskCache:
+    """Persistent cache tier: an append-only file read through mmap
+    
+    Every put appends a record (header, key, JSON value) and an in-memory index
+    maps each key to its latest value. Records carry a CRC32, so on startup the
+    index is rebuilt by scanning the file and a torn or corrupt tail left by a
+    crash is truncated. Overwritten and deleted records are dead space; once
+    they make up compact_ratio of a large enough file, live records are copied
+    to a new file that atomically replaces the old one.
+    """
+    
+    HEADER = struct.Struct('<IIIB')  # crc32, key length, value length, flags
+    TOMBSTONE = 1
+    
+    def __init__(self, path: str, compact_ratio: float = 0.5, min_compact_bytes: int = 1024 * 1024):
+        self.path = path
+        self.compact_ratio = compact_ratio
+        self.min_compact_bytes = min_compact_bytes
+        self.index: Dict[str, Tuple[int, int, int]] = {}  # key -> (value offset, value length, record length)
+        self.file_size = 0
+        self.dead_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.compactions = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._mmap = None
+        self._open()
+    
+    def _open(self):
+        self._file = open(self.path, 'a+b')
+        self.file_size = os.path.getsize(self.path)
+        self._remap()
+        self._recover()
+    
+    def _remap(self):
+        if self._mmap is not None:
+            self._mmap.close()
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.file_size else None
+    
+    def _recover(self):
+        """Rebuild the index from the log, dropping any damaged tail"""
+        self.index.clear()
+        self.dead_bytes = 0
+        offset = 0
+        while offset + self.HEADER.size <= self.file_size:
+            crc, key_length, value_length, flags = self.HEADER.unpack_from(self._mmap, offset)
+            key_start = offset + self.HEADER.size
+            end = key_start + key_length + value_length
+            # The flags byte sits just before the key and is covered by the CRC
+            if end > self.file_size or zlib.crc32(self._mmap[key_start - 1:end]) != crc:
+                break
+            
+            key = self._mmap[key_start:key_start + key_length].decode('utf-8')
+            previous = self.index.pop(key, None)
+            if previous:
+                self.dead_bytes += previous[2]
+            if flags & self.TOMBSTONE:
+                self.dead_bytes += end - offset
+            else:
+                self.index[key] = (key_start + key_length, value_length, end - offset)
+            offset = end
+        
+        if offset < self.file_size:
+            print(f"DiskCache: truncating {self.file_size - offset} damaged bytes from {self.path}")
+            self._file.truncate(offset)
+            self.file_size = offset
+            self._remap()
+    
+    def _append(self, key: str, value_bytes: bytes, flags: int = 0) -> Tuple[int, int]:
+        key_bytes = key.encode('utf-8')
+        # The CRC covers the flags byte, key and value
+        crc = zlib.crc32(bytes([flags]) + key_bytes + value_bytes)
+        record = self.HEADER.pack(crc, len(key_bytes), len(value_bytes), flags) + key_bytes + value_bytes
+        self._file.write(record)
+        self._file.flush()
+        offset = self.file_size
+        self.file_size += len(record)
+        return offset + self.HEADER.size + len(key_bytes), len(record)
+    
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self.index.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value_offset, value_length, _ = entry
+            if self._mmap is None or value_offset + value_length > len(self._mmap):
+                self._remap()  # the file grew since it was mapped
+            self.hits += 1
+            return json.loads(self._mmap[value_offset:value_offset + value_length])
+    
+    def put(self, key: str, value: Dict):
+        value_bytes = json.dumps(value).encode('utf-8')
+        with self._lock:
+            value_offset, record_length = self._append(key, value_bytes)
+            previous = self.index.get(key)
+            if previous:
+                self.dead_bytes += previous[2]
+            self.index[key] = (value_offset, len(value_bytes), record_length)
+            self._maybe_compact()
+    
+    def delete(self, key: str):
+        with self._lock:
+            previous = self.index.pop(key, None)
+            if previous is None:
+                return
+            _, record_length = self._append(key, b'', self.TOMBSTONE)
+            self.dead_bytes += previous[2] + record_length
+            self._maybe_compact()
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self.index
+    
+    def _maybe_compact(self):
+        if self.file_size >= self.min_compact_bytes and self.dead_bytes > self.file_size * self.compact_ratio:
+            self._compact()
+    
+    def compact(self):
+        """Rewrite the file with only live records"""
+        with self._lock:
+            self._compact()
+    
+    def _compact(self):
+        if not self.index and not self.file_size:
+            return  # fresh or empty file: nothing to rewrite
+        if self._mmap is None or len(self._mmap) < self.file_size:
+            self._remap()
+        temp_path = self.path + '.compact'
+        with open(temp_path, 'wb') as new_file:
+            for key, (value_offset, value_length, record_length) in self.index.items():
+                record_start = value_offset + value_length - record_length
+                new_file.write(self._mmap[record_start:value_offset + value_length])
+            new_file.flush()
+            os.fsync(new_file.fileno())
+        
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+        os.replace(temp_path, self.path)  # atomic: readers see old or new file, never half
+        self._open()
+        self.compactions += 1
+    
+    def close(self):
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            self._file.close()
+
+class TieredCache:
+    """In-memory L1 cache backed by a DiskCache L2
+    
+    L1 evictions spill into L2 and L1 misses are checked against L2 before the
+    caller goes to the database. close() spills everything still in L1, so the
+    next process starts warm. L2 does not track TTLs, so use it with L1 caches
+    that don't expire entries.
+    """
+    
+    def __init__(self, l1, l2: DiskCache):
+        self.l1 = l1
+        self.l2 = l2
+        self.l2_hits = 0
+        for shard in getattr(l1, 'shards', [l1]):
+            shard.on_evict = self._spill
+    
+    def _spill(self, key: str, value: Dict):
+        # Values are only replaced through put(), which drops the L2 copy, so
+        # a key already in L2 holds the same value and needn't be rewritten
+        if key not in self.l2:
+            self.l2.put(key, value)
+    
+    def get(self, key: str) -> Optional[Dict]:
+        value = self.l1.get(key)
+        if value is None:
+            value = self.l2.get(key)
+            if value is not None:
+                self.l2_hits += 1
+                self.l1.put(key, value)
+        return value
+    
+    def peek(self, key: str) -> Optional[Dict]:
+        value = self.l1.peek(key)
+        if value is None and key in self.l2:
+            value = self.l2.get(key)
+        return value
+    
+    def put(self, key: str, value: Dict, ttl: Optional[float] = None):
+        if key in self.l2:
+            self.l2.delete(key)
+        self.l1.put(key, value, ttl)
+    
+    def get_many(self, keys: List[str]) -> Dict[str, Dict]:
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+    
+    def put_many(self, items: Dict[str, Dict], ttl: Optional[float] = None):
+        for key, value in items.items():
+            self.put(key, value, ttl)
+    
+    def delete(self, key: str) -> bool:
+        if key in self.l2:
+            self.l2.delete(key)
+        return self.l1.delete(key)
+    
+    def stats(self) -> Dict:
+        stats = self.l1.stats()
+        stats['hits'] = stats['hits'] + self.l2_hits
+        stats['misses'] = stats['misses'] - self.l2_hits
+        stats['l2_hits'] = self.l2_hits
+        stats['l2_size'] = len(self.l2.index)
+        return stats
+    
+    @property
+    def hits(self) -> int:
+        return self.l1.hits + self.l2_hits
+    
+    @property
+    def misses(self) -> int:
+        return self.l1.misses - self.l2_hits
+    
+    def hit_ratio(self) -> float:
+        """Calculate hit percentage across both tiers"""
+        total = self.hits + self.misses
+        return (self.hits / total * 100) if total > 0 else 0
+    
+    def clear_stats(self):
+        self.l1.clear_stats()
+        self.l2_hits = 0
+    
+    def close(self):
+        """Spill L1 to disk and close the L2 file"""
+        for shard in getattr(self.l1, 'shards', [self.l1]):
+            for key, value in list(shard.cache.items()):
+                self._spill(key, value)
+        self.l2.close()
+
+class _InFlightLoad:
+    """A load that other callers can wait on"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class SingleFlight:
+    """Collapses concurrent loads of the same key into a single call
+    
+    The first caller for a key (the leader) runs the loader; callers that arrive
+    while it is running wait for it and share its result or its exception.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, _InFlightLoad] = {}
+    
+    def do(self, key: str, loader: Callable[[], Optional[Dict]]) -> Tuple[Optional[Dict], bool]:
+        """Run loader once per key at a time; returns (value, shared)"""
+        with self._lock:
+            load = self._in_flight.get(key)
+            is_leader = load is None
+            if is_leader:
+                load = _InFlightLoad()
+                self._in_flight[key] = load
+        
+        if not is_leader:
+            load.done.wait()
+            if load.error is not None:
+                raise load.error
+            return load.value, True
+        
+        try:
+            load.value = loader()
+        except Exception as e:
+            load.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            load.done.set()
+        
+        return load.value, False
+
+class BackgroundRefresher:
+    """Reloads stale cache entries on a small worker pool
+    
+    Each key is refreshed at most once at a time, however many requests see it
+    stale. The cache is written from worker threads, so it must be thread-safe
+    (ShardedLRUCache).
+    """
+    
+    def __init__(self, cache, loader: Callable[[str], Optional[Dict]], max_workers: int = 2):
+        self.cache = cache
+        self.loader = loader
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="cache-refresh")
+        self._pending = set()
+        self._lock = threading.Lock()
+    
+    def schedule(self, key: str) -> bool:
+        """Queue a reload of key unless one is already pending"""
+        with self._lock:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+        self.executor.submit(self._refresh, key)
+        return True
+    
+    def _refresh(self, key: str):
+        try:
+            value = self.loader(key)
+            if value is not None:
+                self.cache.refresh(key, value)
+        except Exception as e:
+            print(f"Background refresh of {key} failed: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+    
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait)
+
+class CacheMetrics:
+    """Request latency histograms plus periodic, lock-free snapshots
+    
+    The request path records into the hit/miss histograms and, at most every
+    publish_interval seconds, builds a new snapshot dict. Exporters call
+    snapshot(), which only reads the reference to the last published dict and
+    never touches the cache or its locks.
+    """
+    
+    def __init__(self, app, publish_interval: float = 1.0):
+        self.app = app
+        self.publish_interval = publish_interval
+        self.hit_latency = LatencyHistogram()
+        self.miss_latency = LatencyHistogram()
+        self._last_publish = 0.0
+        self._latest: Dict = {}
+    
+    def record_request(self, seconds: float, was_hit: bool):
+        (self.hit_latency if was_hit else self.miss_latency).record(seconds)
+        if time.monotonic() - self._last_publish >= self.publish_interval:
+            self.publish()
+    
+    def publish(self) -> Dict:
+        """Build and publish a fresh snapshot"""
+        self._last_publish = time.monotonic()
+        cache = self.app.cache
+        snapshot = {
+            'timestamp': time.time(),
+            'hit_latency': self.hit_latency.summary(),
+            'miss_latency': self.miss_latency.summary(),
+            'database_queries': self.app.database.query_count,
+            'coalesced': self.app.coalesced,
+            'cache': cache.stats() if cache is not None and hasattr(cache, 'stats') else {}
+        }
+        self._latest = snapshot  # a single reference swap; readers see old or new
+        return snapshot
+    
+    def snapshot(self) -> Dict:
+        """Most recently published metrics"""
+        return self._latest
 
 class WebApplication:
     """Simulates a web application that serves user profiles"""
     
-    def __init__(self, use_cache: bool = False, cache_size: int = 50):
+    def __init__(self, use_cache: bool = False, cache_size: int = 50, cache=None,
+                 single_flight: bool = False, background_refresh: bool = False,
+                 collect_metrics: bool = False):
         self.database = Database()
-        self.use_cache = use_cache
-        self.cache = LRUCache(cache_size) if use_cache else None
+        self.use_cache = use_cache or cache is not None
+        # Any object with the LRUCache get/put/hit_ratio API can be plugged in,
+        # e.g. ShardedLRUCache when requests are served from a thread pool
+        if cache is not None:
+            self.cache = cache
+        else:
+            self.cache = LRUCache(cache_size) if use_cache else None
+        
+        # Coalesce concurrent misses for the same user into one database query
+        self.single_flight = SingleFlight() if single_flight else None
+        self.coalesced = 0
+        self._stats_lock = threading.Lock()
+        
+        # Serve stale entries immediately and reload them off the request path
+        self.refresher = (BackgroundRefresher(self.cache, self.database.get_user)
+                          if background_refresh else None)
+        
+        # Latency histograms and exporter snapshots (off by default: the
+        # histogram lock would be shared by every request thread)
+        self.metrics = CacheMetrics(self) if collect_metrics else None
+    
+    def _load_user(self, user_id: str) -> Optional[Dict]:
+        """Fetch from the database and populate the cache"""
+        user_data = self.database.get_user(user_id)
+        if user_data:
+            self.cache.put(user_id, user_data)
+        return user_data
+    
+    def _load_user_if_missing(self, user_id: str) -> Optional[Dict]:
+        """Single-flight loader: the previous flight may have cached the user
+        between our miss and us becoming leader, so look again first"""
+        user_data = self.cache.peek(user_id)
+        if user_data is not None:
+            return user_data
+        return self._load_user(user_id)
     
     def get_user_profile(self, user_id: str) -> Optional[Dict]:
         """Get user profile (with optional caching)"""
         
+        if self.metrics is None:
+            return self._get_user_profile(user_id)[0]
+        
+        start_time = time.perf_counter()
+        user_data, was_hit = self._get_user_profile(user_id)
+        self.metrics.record_request(time.perf_counter() - start_time, was_hit)
+        return user_data
+    
+    def _get_user_profile(self, user_id: str) -> Tuple[Optional[Dict], bool]:
+        """Look up a profile; returns (profile, served from cache)"""
+        
         if self.use_cache:
             # TODO: Implement cached lookup
             # Check cache first, if miss then get from database and cache result
             
             # Check cache first
-            user_data = self.cache.get(user_id)
+            if self.refresher is None:
+                user_data = self.cache.get(user_id)
+            else:
+                user_data, is_stale = self.cache.get_with_state(user_id)
+                if is_stale:
+                    self.refresher.schedule(user_id)
             if user_data is not None:
-                return user_data
+                return user_data, True
             
             # Cache miss - get from database
-            user_data = self.database.get_user(user_id)
-            if user_data:
-                self.cache.put(user_id, user_data)
+            if self.single_flight is None:
+                return self._load_user(user_id), False
             
-            return user_data
+            # Share an in-flight load instead of issuing a duplicate query
+            user_data, shared = self.single_flight.do(user_id,
+                                                      lambda: self._load_user_if_missing(user_id))
+            if shared:
+                with self._stats_lock:
+                    self.coalesced += 1
+            return user_data, False
         else:
             # No cache - direct database access
-            return self.database.get_user(user_id)
+            return self.database.get_user(user_id), False
+    
+    def get_user_profiles(self, user_ids: List[str]) -> List[Optional[Dict]]:
+        """Get several profiles, fetching all cache misses in one database query"""
+        
+        found = self.cache.get_many(user_ids) if self.use_cache else {}
+        
+        # dict.fromkeys de-duplicates while keeping request order
+        missing = [user_id for user_id in dict.fromkeys(user_ids) if user_id not in found]
+        if missing:
+            loaded = self.database.get_users(missing)
+            loaded = {user_id: user for user_id, user in loaded.items() if user}
+            if self.use_cache:
+                self.cache.put_many(loaded)
+            found.update(loaded)
+        
+        return [found.get(user_id) for user_id in user_ids]
+    
+    def snapshot_cache(self, path: str, include_values: bool = False) -> int:
+        """Save the cache for the next start (e.g. on shutdown)"""
+        return self.cache.snapshot(path, include_values)
+    
+    def restore_cache(self, path: str, batch_size: int = 50,
+                      max_batches_per_second: float = 20) -> int:
+        """Restore a snapshot, prefetching keys saved without values
+        
+        Missing values are loaded oldest-first with batched queries, paced so
+        the warm-up never issues more than max_batches_per_second queries.
+        Returns the number of database round trips used.
+        """
+        missing = self.cache.restore(path)
+        min_interval = 1.0 / max_batches_per_second
+        batches = 0
+        for start in range(0, len(missing), batch_size):
+            batch_start = time.perf_counter()
+            loaded = self.database.get_users(missing[start:start + batch_size])
+            self.cache.put_many({user_id: user for user_id, user in loaded.items() if user})
+            batches += 1
+            
+            elapsed = time.perf_counter() - batch_start
+            if elapsed < min_interval and start + batch_size < len(missing):
+                time.sleep(min_interval - elapsed)
+        return batches
+
+class AsyncDatabase(Database):
+    """Database whose queries are awaited instead of blocking the event loop"""
+    
+    async def get_user(self, user_id: str) -> Optional[Dict]:
+        """Get user data without stalling other requests"""
+        self.query_count += 1
+        await asyncio.sleep(0.005)  # Simulate 5ms database query
+        return self.users.get(user_id)
+    
+    async def get_users(self, user_ids: List[str]) -> Dict[str, Optional[Dict]]:
+        """Get many users in one round trip"""
+        self.query_count += 1
+        await asyncio.sleep(0.005)
+        return {user_id: self.users.get(user_id) for user_id in user_ids}
+
+class AsyncWebApplication:
+    """WebApplication for an asyncio serving tier
+    
+    Cache lookups stay synchronous (they never block), misses await the
+    database, and concurrent misses for the same user share one in-flight
+    query. Everything runs on one event loop, so no locks are needed.
+    """
+    
+    def __init__(self, use_cache: bool = True, cache_size: int = 50, cache=None):
+        self.database = AsyncDatabase()
+        if cache is not None:
+            self.cache = cache
+        else:
+            self.cache = LRUCache(cache_size) if use_cache else None
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.coalesced = 0
+    
+    async def _load_user(self, user_id: str) -> Optional[Dict]:
+        user_data = await self.database.get_user(user_id)
+        if user_data and self.cache is not None:
+            self.cache.put(user_id, user_data)
+        return user_data
+    
+    def _load_done(self, user_id: str, load: asyncio.Task):
+        if self._in_flight.get(user_id) is load:
+            del self._in_flight[user_id]
+        if not load.cancelled():
+            load.exception()  # mark it retrieved, in case every waiter was cancelled
+    
+    async def get_user_profile(self, user_id: str) -> Optional[Dict]:
+        """Get user profile, awaiting the database only on a cache miss"""
+        
+        if self.cache is not None:
+            user_data = self.cache.get(user_id)
+            if user_data is not None:
+                return user_data
+        
+        # Another request is already loading this user - wait for its result
+        load = self._in_flight.get(user_id)
+        if load is not None:
+            self.coalesced += 1
+        else:
+            # The load is its own task rather than part of the first request,
+            # so cancelling that request doesn't fail the others waiting on it
+            load = asyncio.ensure_future(self._load_user(user_id))
+            self._in_flight[user_id] = load
+            load.add_done_callback(lambda task: self._load_done(user_id, task))
+        return await asyncio.shield(load)
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
 
 class PerformanceTester:
     """Tests and compares application performance"""
@@ -130,10 +1449,21 @@ class PerformanceTester:
         
         return requests
     
-    def test_performance(self, use_cache: bool, requests: List[str]) -> Dict:
+    def generate_scan_requests(self, num_requests: int = 3000, scan_interval: int = 750) -> List[str]:
+        """Mix the 80/20 traffic with periodic crawler scans over regular users"""
+        
+        requests = []
+        scan = [f"user_{i}" for i in range(40, 200)]
+        for start in range(0, num_requests, scan_interval):
+            requests.extend(self.generate_user_requests(min(scan_interval, num_requests - start)))
+            requests.extend(scan)
+        
+        return requests
+    
+    def test_performance(self, use_cache: bool, requests: List[str], cache=None) -> Dict:
         """Test application performance"""
         
-        app = WebApplication(use_cache=use_cache, cache_size=50)
+        app = WebApplication(use_cache=use_cache, cache_size=50, cache=cache)
         
         print(f"Testing {'WITH' if use_cache else 'WITHOUT'} cache...")
         
@@ -165,6 +1495,413 @@ class PerformanceTester:
         
         return results
     
+    def test_concurrent_performance(self, cache, requests: List[str], num_threads: int) -> Dict:
+        """Serve requests from a thread pool sharing one cache"""
+        
+        app = WebApplication(cache=cache)
+        
+        # Warm the cache so the run measures cache access, not database latency
+        for user_id in set(requests):
+            app.get_user_profile(user_id)
+        app.database.reset_stats()
+        app.cache.clear_stats()
+        
+        chunk_size = -(-len(requests) // num_threads)
+        chunks = [requests[i:i + chunk_size] for i in range(0, len(requests), chunk_size)]
+        
+        def worker(chunk: List[str]):
+            for user_id in chunk:
+                app.get_user_profile(user_id)
+        
+        start_time = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=num_threads) as executor:
+            list(executor.map(worker, chunks))
+        total_time = time.perf_counter() - start_time
+        
+        return {
+            'threads': num_threads,
+            'total_time': total_time,
+            'throughput': len(requests) / total_time if total_time > 0 else 0,
+            'database_queries': app.database.query_count,
+            'hit_ratio': app.cache.hit_ratio()
+        }
+    
+    def test_cold_start(self, single_flight: bool, requests: List[str], num_threads: int) -> Dict:
+        """Serve requests concurrently against an empty cache"""
+        
+        # Room for every user, so the only misses are the cold-start ones
+        app = WebApplication(cache=ShardedLRUCache(400), single_flight=single_flight)
+        
+        # Interleave requests so every thread starts on the same hot users
+        chunks = [requests[i::num_threads] for i in range(num_threads)]
+        
+        def worker(chunk: List[str]):
+            for user_id in chunk:
+                app.get_user_profile(user_id)
+        
+        start_time = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=num_threads) as executor:
+            list(executor.map(worker, chunks))
+        total_time = time.perf_counter() - start_time
+        
+        # Coalesced waiters missed the cache but never reached the database
+        return {
+            'single_flight': single_flight,
+            'total_time': total_time,
+            'database_queries': app.database.query_count,
+            'duplicate_queries': app.database.query_count - len(set(requests)),
+            'cache_hits': app.cache.hits,
+            'cache_misses': app.cache.misses - app.coalesced,
+            'coalesced': app.coalesced
+        }
+    
+    def run_cold_start_benchmark(self, num_requests: int = 2000, num_threads: int = 64):
+        """Compare database load during a cold start with and without single-flight"""
+        
+        print(f"\n" + "=" * 50)
+        print("COLD START: SINGLE-FLIGHT COMPARISON")
+        print("=" * 50)
+        
+        requests = self.generate_user_requests(num_requests)
+        
+        print(f"{'Mode':<16}{'Time':>9}{'DB queries':>12}{'Duplicate':>11}"
+              f"{'Hits':>8}{'Misses':>8}{'Coalesced':>11}")
+        print("-" * 75)
+        results = []
+        for single_flight in (False, True):
+            result = self.test_cold_start(single_flight, requests, num_threads)
+            results.append(result)
+            mode = 'Single-flight' if single_flight else 'Uncoalesced'
+            print(f"{mode:<16}{result['total_time']:>8.3f}s{result['database_queries']:>12}"
+                  f"{result['duplicate_queries']:>11}{result['cache_hits']:>8}{result['cache_misses']:>8}{result['coalesced']:>11}")
+        
+        return results
+    
+    def test_ttl_latency(self, stale_ttl: float, requests: List[str], ttl: float) -> Dict:
+        """Measure per-request latency while cached entries keep expiring"""
+        
+        cache = ShardedLRUCache(400, default_ttl=ttl, stale_ttl=stale_ttl)
+        app = WebApplication(cache=cache, background_refresh=stale_ttl > 0)
+        for user_id in set(requests):
+            app.get_user_profile(user_id)
+        app.database.reset_stats()
+        cache.clear_stats()
+        
+        latencies = []
+        for user_id in requests:
+            start_time = time.perf_counter()
+            app.get_user_profile(user_id)
+            latencies.append(time.perf_counter() - start_time)
+            time.sleep(0.0005)  # Spread requests so entries roll over mid-run
+        
+        if app.refresher:
+            app.refresher.shutdown()
+        
+        return {
+            'stale_ttl': stale_ttl,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'database_queries': app.database.query_count,
+            'expirations': cache.expirations,
+            'stale_hits': cache.stale_hits,
+            'refreshes': cache.refreshes
+        }
+    
+    def run_ttl_benchmark(self, num_requests: int = 3000, ttl: float = 0.25):
+        """Compare hard TTL expiry against stale-while-revalidate"""
+        
+        print(f"\n" + "=" * 50)
+        print("TTL EXPIRY vs STALE-WHILE-REVALIDATE")
+        print("=" * 50)
+        
+        requests = self.generate_user_requests(num_requests)
+        modes = {
+            'Hard expiry': 0.0,
+            'Stale-while-revalidate': ttl * 40
+        }
+        
+        print(f"{'Mode':<24}{'p50':>8}{'p99':>9}{'DB queries':>12}{'Expired':>9}{'Refreshed':>11}")
+        print("-" * 73)
+        results = []
+        for name, stale_ttl in modes.items():
+            result = self.test_ttl_latency(stale_ttl, requests, ttl)
+            results.append(result)
+            print(f"{name:<24}{result['p50_ms']:>6.3f}ms{result['p99_ms']:>7.3f}ms"
+                  f"{result['database_queries']:>12}{result['expirations']:>9}{result['refreshes']:>11}")
+        
+        return results
+    
+    def test_memory_budget(self, cache, requests: List[str], rounds: int) -> List[int]:
+        """Serve traffic in rounds, recording traced memory growth after each one"""
+        
+        app = WebApplication(cache=cache)
+        app.database = VariableSizeDatabase()
+        
+        # tracemalloc counts live Python allocations only, so unlike RSS the
+        # numbers are not blurred by allocator arenas or freed-but-kept pages
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        growth = []
+        try:
+            for _ in range(rounds):
+                for user_id in requests:
+                    app.get_user_profile(user_id)
+                growth.append(tracemalloc.get_traced_memory()[0] - baseline)
+        finally:
+            tracemalloc.stop()
+        
+        return growth
+    
+    def run_memory_budget_benchmark(self, max_bytes: int = 1024 * 1024,
+                                    num_requests: int = 1000, rounds: int = 4):
+        """Show that a byte-bounded cache keeps memory growth under its budget"""
+        
+        print(f"\n" + "=" * 50)
+        print("MEMORY-BOUNDED CACHE BENCHMARK")
+        print("=" * 50)
+        print(f"Byte budget: {max_bytes / 1024 / 1024:.2f} MB")
+        
+        requests = self.generate_user_requests(num_requests)
+        # Same entry cap for both, so the only difference is the byte bound
+        caches = {
+            'Weighted (max_bytes)': LRUCache(1000, max_bytes=max_bytes),
+            'Entry count only': LRUCache(1000)
+        }
+        
+        print(f"{'Cache':<22}{'Entries':>9}" + "".join(f"{f'Round {n}':>10}" for n in range(1, rounds + 1))
+              + "  Budget")
+        print("-" * (31 + 10 * rounds + 8))
+        results = {}
+        for name, cache in caches.items():
+            growth = self.test_memory_budget(cache, requests, rounds)
+            results[name] = growth
+            within_budget = max(growth) <= max_bytes
+            print(f"{name:<22}{len(cache.cache):>9}"
+                  + "".join(f"{delta / 1024 / 1024:>8.2f}MB" for delta in growth)
+                  + f"  {'within' if within_budget else 'OVER'}")
+        
+        return results
+    
+    def run_batch_benchmark(self, page_size: int = 50, num_pages: int = 20):
+        """Compare rendering feed pages one profile at a time against batched lookups"""
+        
+        print(f"\n" + "=" * 50)
+        print("BATCHED FEED PAGE BENCHMARK")
+        print("=" * 50)
+        
+        pages = [self.generate_user_requests(page_size) for _ in range(num_pages)]
+        modes = {
+            'One at a time': lambda app, page: [app.get_user_profile(user_id) for user_id in page],
+            'Batched': lambda app, page: app.get_user_profiles(page)
+        }
+        
+        print(f"{'Mode':<16}{'Time':>9}{'DB round trips':>16}{'Max per page':>14}")
+        print("-" * 55)
+        results = {}
+        for name, render_page in modes.items():
+            app = WebApplication(use_cache=True, cache_size=50)
+            max_per_page = 0
+            start_time = time.perf_counter()
+            for page in pages:
+                queries_before = app.database.query_count
+                render_page(app, page)
+                max_per_page = max(max_per_page, app.database.query_count - queries_before)
+            total_time = time.perf_counter() - start_time
+            
+            results[name] = {
+                'total_time': total_time,
+                'database_queries': app.database.query_count,
+                'max_queries_per_page': max_per_page
+            }
+            print(f"{name:<16}{total_time:>8.3f}s{app.database.query_count:>16}{max_per_page:>14}")
+        
+        return results
+    
+    def run_warm_restart_benchmark(self, num_requests: int = 1000):
+        """Compare a restart with an empty cache against one backed by a DiskCache"""
+        
+        print(f"\n" + "=" * 50)
+        print("WARM RESTART WITH A DISK-BACKED L2 CACHE")
+        print("=" * 50)
+        
+        requests = self.generate_user_requests(num_requests)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'l2_cache.log')
+            
+            # First process: fill the cache, then shut down cleanly
+            first = WebApplication(cache=TieredCache(LRUCache(50), DiskCache(path)))
+            for user_id in requests:
+                first.get_user_profile(user_id)
+            first.cache.close()
+            
+            results = {}
+            for name in ('Cold restart', 'Warm restart (L2)'):
+                cache = LRUCache(50) if name == 'Cold restart' else TieredCache(LRUCache(50), DiskCache(path))
+                app = WebApplication(cache=cache)
+                start_time = time.perf_counter()
+                for user_id in requests:
+                    app.get_user_profile(user_id)
+                results[name] = {
+                    'total_time': time.perf_counter() - start_time,
+                    'database_queries': app.database.query_count,
+                    'hit_ratio': cache.hit_ratio()
+                }
+                if isinstance(cache, TieredCache):
+                    results[name]['l2_hits'] = cache.l2_hits
+                    cache.close()
+        
+        print(f"{'Mode':<20}{'Time':>9}{'DB queries':>12}{'Hit ratio':>11}")
+        print("-" * 52)
+        for name, result in results.items():
+            print(f"{name:<20}{result['total_time']:>8.3f}s{result['database_queries']:>12}"
+                  f"{result['hit_ratio']:>10.1f}%")
+        
+        return results
+    
+    def run_snapshot_benchmark(self, num_requests: int = 2000, windows: Optional[List[int]] = None):
+        """Compare hit ratio early in a cold start against a snapshot restore"""
+        
+        windows = windows or [100, 300, 1000, 2000]
+        
+        print(f"\n" + "=" * 50)
+        print("COLD START vs SNAPSHOT RESTORE")
+        print("=" * 50)
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'cache.snapshot')
+            
+            # Previous process: serve traffic, then snapshot keys on shutdown
+            previous = WebApplication(use_cache=True, cache_size=50)
+            for user_id in self.generate_user_requests(num_requests):
+                previous.get_user_profile(user_id)
+            saved = previous.snapshot_cache(path)
+            print(f"Snapshot: {saved} keys, {os.path.getsize(path)} bytes")
+            
+            requests = self.generate_user_requests(num_requests)
+            results = {}
+            for name in ('Cold start', 'Restored'):
+                app = WebApplication(use_cache=True, cache_size=50)
+                warmup_queries = app.restore_cache(path) if name == 'Restored' else 0
+                app.cache.clear_stats()
+                
+                window_ratios = {}
+                for served, user_id in enumerate(requests, start=1):
+                    app.get_user_profile(user_id)
+                    if served in windows:
+                        window_ratios[served] = app.cache.hit_ratio()
+                results[name] = {'warmup_queries': warmup_queries, 'hit_ratio': window_ratios}
+        
+        header = ''.join(f"{'first ' + str(w):>12}" for w in windows)
+        print(f"{'Mode':<12}{'Warm-up':>9}{header}")
+        print("-" * (21 + 12 * len(windows)))
+        for name, result in results.items():
+            ratios = ''.join(f"{result['hit_ratio'].get(w, 0):>11.1f}%" for w in windows)
+            print(f"{name:<12}{result['warmup_queries']:>9}{ratios}")
+        
+        return results
+    
+    def run_metrics_report(self, num_requests: int = 2000):
+        """Serve traffic with metrics enabled and print the exported snapshot"""
+        
+        print(f"\n" + "=" * 50)
+        print("CACHE METRICS SNAPSHOT")
+        print("=" * 50)
+        
+        cache = ShardedLRUCache(50, track_hot_keys=20, default_ttl=0.5)
+        app = WebApplication(cache=cache, collect_metrics=True)
+        for user_id in self.generate_scan_requests(num_requests):
+            app.get_user_profile(user_id)
+        for user_id, _, _ in cache.stats()['hot_keys'][:2]:
+            # e.g. the profile was edited: read it back in so the key is
+            # resident (its TTL may have lapsed), then invalidate it
+            app.get_user_profile(user_id)
+            cache.delete(user_id)
+        
+        snapshot = app.metrics.publish()
+        for path in ('hit_latency', 'miss_latency'):
+            summary = snapshot[path]
+            print(f"{path.replace('_', ' ').title():<14} n={summary['count']:<6} "
+                  f"p50={summary['p50_us']}us p99={summary['p99_us']}us "
+                  f"p99.9={summary['p999_us']}us max={summary['max_us']}us")
+        print(f"Evictions by reason: {snapshot['cache']['evictions']}")
+        print("Hot keys (key, count, max overestimate):")
+        for key, count, error in snapshot['cache']['hot_keys'][:5]:
+            print(f"  {key:<10}{count:>6}{error:>6}")
+        
+        return snapshot
+    
+    def run_async_benchmark(self, num_requests: int = 10000):
+        """Compare sync handlers in an executor against native async handlers"""
+        
+        print(f"\n" + "=" * 50)
+        print(f"ASYNCIO: {num_requests:,} CONCURRENT REQUESTS")
+        print("=" * 50)
+        
+        requests = self.generate_user_requests(num_requests)
+        
+        async def serve_in_executor() -> WebApplication:
+            # The usual retrofit: blocking handlers on the loop's default thread pool.
+            # One shard keeps the same LRU behaviour as the async app's cache.
+            app = WebApplication(cache=ShardedLRUCache(50, num_shards=1), single_flight=True)
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*(loop.run_in_executor(None, app.get_user_profile, user_id)
+                                   for user_id in requests))
+            return app
+        
+        async def serve_native() -> AsyncWebApplication:
+            app = AsyncWebApplication(cache_size=50)
+            await asyncio.gather(*(app.get_user_profile(user_id) for user_id in requests))
+            return app
+        
+        print(f"{'Mode':<20}{'Time':>9}{'Requests/s':>13}{'DB queries':>12}{'Coalesced':>11}")
+        print("-" * 65)
+        results = {}
+        for name, serve in (('Sync in executor', serve_in_executor), ('Native async', serve_native)):
+            start_time = time.perf_counter()
+            app = asyncio.run(serve())
+            total_time = time.perf_counter() - start_time
+            results[name] = {
+                'total_time': total_time,
+                'throughput': num_requests / total_time,
+                'database_queries': app.database.query_count,
+                'coalesced': app.coalesced
+            }
+            print(f"{name:<20}{total_time:>8.3f}s{num_requests / total_time:>13,.0f}"
+                  f"{app.database.query_count:>12}{app.coalesced:>11}")
+        
+        return results
+    
+    def run_contention_benchmark(self, thread_counts: Optional[List[int]] = None,
+                                 num_requests: int = 200000):
+        """Compare a single-lock cache against a sharded cache under contention"""
+        
+        thread_counts = thread_counts or [1, 4, 16, 64]
+        
+        print(f"\n" + "=" * 50)
+        print("CACHE CONTENTION BENCHMARK")
+        print("=" * 50)
+        
+        requests = self.generate_user_requests(num_requests)
+        # A single shard is equivalent to wrapping LRUCache in one global lock.
+        # Capacity covers every user so uneven shard fill never forces a miss.
+        cache_factories = {
+            'Global lock (1 shard)': lambda: ShardedLRUCache(400, num_shards=1),
+            'Sharded (16 shards)': lambda: ShardedLRUCache(400, num_shards=16)
+        }
+        
+        print(f"{'Cache':<24}{'Threads':>8}{'Requests/s':>14}{'Hit ratio':>11}")
+        print("-" * 57)
+        results = []
+        for name, factory in cache_factories.items():
+            for num_threads in thread_counts:
+                result = self.test_concurrent_performance(factory(), requests, num_threads)
+                result['cache'] = name
+                results.append(result)
+                print(f"{name:<24}{num_threads:>8}{result['throughput']:>14,.0f}"
+                      f"{result['hit_ratio']:>10.1f}%")
+        
+        return results
+    
     def run_comparison(self):
         """Run performance comparison"""
         
@@ -186,8 +1923,35 @@ class PerformanceTester:
         # Print results
         self.print_comparison(no_cache_results, cache_results)
         
+        # Compare eviction policies on traffic with crawler scans
+        self.compare_eviction_policies()
+        
         return no_cache_results, cache_results
     
+    def compare_eviction_policies(self) -> Dict[str, Dict]:
+        """Report hit ratio and database queries per eviction policy"""
+        
+        requests = self.generate_scan_requests()
+        policies = {
+            'LRU': LRUPolicy,
+            'W-TinyLFU': TinyLFUPolicy,
+            'ARC': ARCPolicy
+        }
+        
+        print(f"\nEVICTION POLICIES (80/20 traffic + scans, {len(requests)} requests):")
+        print("-" * 40)
+        
+        results = {}
+        for name, policy in policies.items():
+            results[name] = self.test_performance(True, requests, cache=LRUCache(50, policy))
+        
+        print(f"{'Policy':<12}{'Hit ratio':>11}{'DB queries':>12}{'Time':>9}")
+        for name, result in results.items():
+            print(f"{name:<12}{result['hit_ratio']:>10.1f}%{result['database_queries']:>12}"
+                  f"{result['total_time']:>8.2f}s")
+        
+        return results
+    
     def print_comparison(self, no_cache: Dict, with_cache: Dict):
         """Print formatted comparison results"""
         
@@ -262,6 +2026,33 @@ def main():
     tester = PerformanceTester()
     no_cache_results, cache_results = tester.run_comparison()
     
+    # Measure lock contention with many request threads
+    tester.run_contention_benchmark()
+    
+    # Measure duplicate database queries when many threads miss at once
+    tester.run_cold_start_benchmark()
+    
+    # Measure tail latency while entries expire
+    tester.run_ttl_benchmark()
+    
+    # Check that a byte budget bounds real memory use
+    tester.run_memory_budget_benchmark()
+    
+    # Measure database round trips for multi-profile pages
+    tester.run_batch_benchmark()
+    
+    # Restart the app on top of a persistent L2 cache
+    tester.run_warm_restart_benchmark()
+    
+    # Restart from a snapshot of keys instead of a full L2 tier
+    tester.run_snapshot_benchmark()
+    
+    # Show what a metrics exporter would scrape
+    tester.run_metrics_report()
+    
+    # Compare thread-pool and native asyncio serving
+    tester.run_async_benchmark()
+    
     # Analyze scenarios
     analyze_caching_scenarios()
     
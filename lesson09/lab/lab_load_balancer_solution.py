@@ -1,30 +1,125 @@
 # load_balancer_lab.py
+import hashlib
+import heapq
+import math
+import os
+import sys
 import random
+import threading
 import time
-from typing import List, Optional
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
 
 class Server:
     """Represents a web server"""
     
-    def __init__(self, server_id: int, name: str):
+    def __init__(self, server_id: int, name: str, speed: float = 1.0):
         self.id = server_id
         self.name = name
-        self.active_connections = 0
+        self.speed = speed  # processing time multiplier: 2.0 is twice as slow
+        self._listeners: List[Callable[['Server'], None]] = []
+        self._health_listeners: List[Callable[['Server'], None]] = []
+        self._active_connections = 0
+        self._is_healthy = True
         self.total_requests = 0
-        self.is_healthy = True
+        self.responding = True  # what a health probe sees, unlike is_healthy
+        self.down_reasons = set()  # e.g. "probe", "outlier"
+        # Request threads, the health checker and the outlier detector all
+        # update servers; this makes each change and its callbacks atomic
+        # (reentrant: mark_down holds it while setting is_healthy)
+        self._lock = threading.RLock()
+    
+    def add_listener(self, callback: Callable[['Server'], None], health_only: bool = False):
+        """Call back whenever active_connections or is_healthy changes
+        
+        With health_only, only is_healthy changes call back, which keeps
+        listeners that ignore load off the per-request path.
+        """
+        if health_only:
+            self._health_listeners.append(callback)
+        else:
+            self._listeners.append(callback)
+    
+    def remove_listener(self, callback: Callable[['Server'], None]):
+        """Stop calling back; does nothing if callback isn't registered"""
+        # Build new lists so a _notify already iterating the old one is unaffected
+        self._listeners = [listener for listener in self._listeners if listener != callback]
+        self._health_listeners = [listener for listener in self._health_listeners
+                                  if listener != callback]
+    
+    def _notify(self, health_changed: bool = False):
+        for callback in self._listeners:
+            callback(self)
+        if health_changed:
+            for callback in self._health_listeners:
+                callback(self)
+    
+    @property
+    def active_connections(self) -> int:
+        return self._active_connections
+    
+    @active_connections.setter
+    def active_connections(self, value: int):
+        with self._lock:
+            self._active_connections = value
+            self._notify()
+    
+    def add_connections(self, delta: int):
+        """Change active_connections by delta as one atomic step
+        
+        `active_connections += 1` is a separate read and write, so two
+        threads doing it at once can lose an update.
+        """
+        with self._lock:
+            self._active_connections += delta
+            self._notify()
+    
+    @property
+    def is_healthy(self) -> bool:
+        return self._is_healthy
+    
+    @is_healthy.setter
+    def is_healthy(self, value: bool):
+        with self._lock:
+            self._is_healthy = value
+            self._notify(health_changed=True)
     
     def handle_request(self):
         """Process a request (simplified)"""
-        self.active_connections += 1
+        self.add_connections(1)
         self.total_requests += 1
         
-        # Simulate variable processing time
-        processing_time = random.uniform(0.1, 0.3)
-        time.sleep(processing_time * 0.01)  # Speed up for demo
+        self.process()
         
-        self.active_connections -= 1
+        self.add_connections(-1)
         return f"Processed by {self.name}"
     
+    def process(self):
+        """Do a request's work, without touching the connection count"""
+        # Simulate variable processing time
+        processing_time = random.uniform(0.1, 0.3) * self.speed
+        time.sleep(processing_time * 0.01)  # Speed up for demo
+    
+    def ping(self) -> bool:
+        """Answer a health probe"""
+        return self.responding
+    
+    def mark_down(self, reason: str):
+        """Take the server out of rotation for a reason"""
+        with self._lock:
+            self.down_reasons.add(reason)
+            if self.is_healthy:
+                self.is_healthy = False
+    
+    def mark_up(self, reason: str):
+        """Clear one reason; the server returns once no reasons are left"""
+        with self._lock:
+            self.down_reasons.discard(reason)
+            if not self.down_reasons and not self.is_healthy:
+                self.is_healthy = True
+    
     def fail(self):
         """Simulate server failure"""
         self.is_healthy = False
@@ -35,35 +130,224 @@ class Server:
         self.is_healthy = True
         print(f"{self.name} has recovered!")
 
+class HealthyServerSet:
+    """Healthy servers in pool order, updated only when a server's health flips
+    
+    Balancers index straight into it, so a pick never looks at a dead server.
+    A server that comes back is ramped up over slow_start seconds: weight()
+    grows linearly from min_weight to 1.0 so it is not flooded while cold.
+    
+    Health can flip on a HealthChecker thread while other threads pick, so
+    changes build a new list under a lock and swap it in; a reader that takes
+    `servers` once sees a consistent snapshot without locking.
+    """
+    
+    def __init__(self, servers: List[Server], slow_start: float = 0.0,
+                 min_weight: float = 0.1, clock: Callable[[], float] = time.monotonic):
+        self.slow_start = slow_start
+        self.min_weight = min_weight
+        self.clock = clock
+        self.rank = {server.id: index for index, server in enumerate(servers)}
+        self.servers: List[Server] = [server for server in servers if server.is_healthy]
+        self._ranks: List[int] = [self.rank[server.id] for server in self.servers]
+        self.healthy_since: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._watched = servers
+        for server in servers:
+            server.add_listener(self._on_server_change, health_only=True)
+    
+    def close(self):
+        """Unsubscribe from the servers so they can outlive this set"""
+        for server in self._watched:
+            server.remove_listener(self._on_server_change)
+    
+    def __len__(self) -> int:
+        return len(self.servers)
+    
+    def __getitem__(self, index: int) -> Server:
+        return self.servers[index]
+    
+    def _present(self, server: Server) -> Tuple[int, bool]:
+        ranks = self._ranks
+        index = bisect_left(ranks, self.rank[server.id])
+        return index, index < len(ranks) and ranks[index] == self.rank[server.id]
+    
+    def _on_server_change(self, server: Server):
+        # is_healthy may be set to the value it already has, so first a
+        # lock-free check that health still matches membership
+        if server.is_healthy == self._present(server)[1]:
+            return
+        with self._lock:
+            index, present = self._present(server)
+            if server.is_healthy and not present:
+                self.healthy_since[server.id] = self.clock()
+                self._ranks = self._ranks[:index] + [self.rank[server.id]] + self._ranks[index:]
+                self.servers = self.servers[:index] + [server] + self.servers[index:]
+            elif not server.is_healthy and present:
+                self._ranks = self._ranks[:index] + self._ranks[index + 1:]
+                self.servers = self.servers[:index] + self.servers[index + 1:]
+    
+    def weight(self, server: Server) -> float:
+        """Slow-start weight between min_weight and 1.0"""
+        if not self.slow_start or server.id not in self.healthy_since:
+            return 1.0
+        ramp = (self.clock() - self.healthy_since[server.id]) / self.slow_start
+        return min(1.0, max(self.min_weight, ramp))
+
 class RoundRobinBalancer:
     """Round Robin load balancing - takes turns with each server"""
     
-    def __init__(self, servers: List[Server]):
+    def __init__(self, servers: List[Server], healthy: Optional[HealthyServerSet] = None,
+                 rng: Optional[random.Random] = None):
         self.servers = servers
+        self._owns_healthy = healthy is None
+        self.healthy = healthy or HealthyServerSet(servers)
+        self.rng = rng or random.Random()
         self.current_index = 0
     
+    def close(self):
+        """Unsubscribe from the servers (a shared HealthyServerSet stays open)"""
+        if self._owns_healthy:
+            self.healthy.close()
+    
     def select_server(self) -> Optional[Server]:
         """Select next healthy server in round-robin order"""
         
-        # HINT: Use self.current_index to track which server is next
-        # HINT: Use % len(self.servers) to wrap around to start
-        # HINT: Check server.is_healthy before returning
-        # HINT: Try all servers before giving up
-        
-        # YOUR CODE HERE (3-4 lines)
-        attempts = 0
-        while attempts < len(self.servers):
-            server = self.servers[self.current_index]
-            self.current_index = (self.current_index + 1) % len(self.servers)
-            
-            if server.is_healthy:
+        # Only healthy servers are in self.healthy, so there is nothing to skip
+        # unless a server is still in slow start
+        servers = self.healthy.servers  # one snapshot, even if health flips meanwhile
+        server = None
+        for _ in range(len(servers)):
+            server = servers[self.current_index % len(servers)]
+            self.current_index += 1
+            weight = self.healthy.weight(server)
+            if weight >= 1.0 or self.rng.random() < weight:
                 return server
-            attempts += 1
         
-        return None  # No healthy servers
+        return server  # None when no servers are healthy
+
+class IndexedMinHeap:
+    """Binary min-heap of servers keyed on (active_connections, id)
+    
+    A position index lets a server whose key changed be moved in place, so
+    push, remove and update are all O(log n) and the minimum is O(1).
+    """
+    
+    def __init__(self):
+        self.heap: List[Server] = []
+        self.position: Dict[int, int] = {}  # server id -> index in heap
+    
+    def __len__(self) -> int:
+        return len(self.heap)
+    
+    def __contains__(self, server: Server) -> bool:
+        return server.id in self.position
+    
+    @staticmethod
+    def _key(server: Server):
+        return (server.active_connections, server.id)
+    
+    def peek(self) -> Optional[Server]:
+        return self.heap[0] if self.heap else None
+    
+    def push(self, server: Server):
+        self.heap.append(server)
+        self.position[server.id] = len(self.heap) - 1
+        self._sift_up(len(self.heap) - 1)
+    
+    def remove(self, server: Server):
+        index = self.position.pop(server.id)
+        last = self.heap.pop()
+        if index < len(self.heap):
+            # Fill the hole with the last element and restore heap order
+            self.heap[index] = last
+            self.position[last.id] = index
+            self.update(last)
+    
+    def update(self, server: Server):
+        """Restore heap order after server's key changed"""
+        index = self.position[server.id]
+        self._sift_up(index)
+        self._sift_down(self.position[server.id])
+    
+    def _swap(self, i: int, j: int):
+        self.heap[i], self.heap[j] = self.heap[j], self.heap[i]
+        self.position[self.heap[i].id] = i
+        self.position[self.heap[j].id] = j
+    
+    def _sift_up(self, index: int):
+        while index > 0:
+            parent = (index - 1) // 2
+            if self._key(self.heap[index]) >= self._key(self.heap[parent]):
+                break
+            self._swap(index, parent)
+            index = parent
+    
+    def _sift_down(self, index: int):
+        size = len(self.heap)
+        while True:
+            smallest = index
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < size and self._key(self.heap[child]) < self._key(self.heap[smallest]):
+                    smallest = child
+            if smallest == index:
+                return
+            self._swap(index, smallest)
+            index = smallest
 
 class LeastConnectionsBalancer:
-    """Least Connections load balancing - sends requests to least busy server"""
+    """Least Connections load balancing - sends requests to least busy server
+    
+    Healthy servers live in an IndexedMinHeap that servers update in place
+    when their connection count or health changes, so picking never scans.
+    A lock keeps the heap consistent when health changes on another thread.
+    
+    With a slow-start HealthyServerSet, a ramping server at the top of the
+    heap is passed over for the runner-up with probability 1 - weight.
+    """
+    
+    def __init__(self, servers: List[Server], healthy: Optional[HealthyServerSet] = None,
+                 rng: Optional[random.Random] = None):
+        self.servers = servers
+        self.healthy = healthy
+        self.rng = rng or random.Random()
+        self.heap = IndexedMinHeap()
+        self._lock = threading.RLock()
+        for server in servers:
+            if server.is_healthy:
+                self.heap.push(server)
+            server.add_listener(self._on_server_change)
+    
+    def close(self):
+        """Unsubscribe from the servers"""
+        for server in self.servers:
+            server.remove_listener(self._on_server_change)
+    
+    def _on_server_change(self, server: Server):
+        with self._lock:
+            if server.is_healthy:
+                if server in self.heap:
+                    self.heap.update(server)
+                else:
+                    self.heap.push(server)
+            elif server in self.heap:
+                self.heap.remove(server)
+    
+    def select_server(self) -> Optional[Server]:
+        """Select the healthy server with the fewest active connections"""
+        with self._lock:
+            best = self.heap.peek()
+            if best is None or self.healthy is None:
+                return best
+            weight = self.healthy.weight(best)
+            if weight >= 1.0 or self.rng.random() < weight:
+                return best
+            # The second smallest key is one of the root's children
+            runners_up = self.heap.heap[1:3]
+            return min(runners_up, key=IndexedMinHeap._key) if runners_up else best
+
+class ScanLeastConnectionsBalancer:
+    """Least Connections by scanning every server on each pick (O(n) baseline)"""
     
     def __init__(self, servers: List[Server]):
         self.servers = servers
@@ -81,20 +365,582 @@ class LeastConnectionsBalancer:
             return None
         return min(healthy_servers, key=lambda s: s.active_connections)
 
+class PowerOfTwoChoicesBalancer:
+    """Pick two random healthy servers and use the less loaded one
+    
+    Nearly as good as least connections at spreading load, but O(1) per pick
+    and without every balancer instance herding onto the same server.
+    """
+    
+    def __init__(self, servers: List[Server], rng: Optional[random.Random] = None,
+                 healthy: Optional[HealthyServerSet] = None):
+        self.servers = servers
+        self.rng = rng or random.Random()
+        self._owns_healthy = healthy is None
+        self.healthy = healthy or HealthyServerSet(servers)
+    
+    def close(self):
+        """Unsubscribe from the servers (a shared HealthyServerSet stays open)"""
+        if self._owns_healthy:
+            self.healthy.close()
+    
+    def cost(self, server: Server) -> float:
+        return server.active_connections + 1
+    
+    def _weighted_cost(self, server: Server) -> float:
+        # A server in slow start looks proportionally more expensive
+        return self.cost(server) / self.healthy.weight(server)
+    
+    def select_server(self) -> Optional[Server]:
+        """Select the cheaper of two random healthy servers"""
+        servers = self.healthy.servers  # one snapshot, even if health flips meanwhile
+        count = len(servers)
+        if count == 0:
+            return None
+        if count == 1:
+            return servers[0]
+        first = self.rng.randrange(count)
+        second = self.rng.randrange(count - 1)
+        if second >= first:
+            second += 1  # two distinct servers without building a sample list
+        return min(servers[first], servers[second], key=self._weighted_cost)
+
+class PeakEWMABalancer(PowerOfTwoChoicesBalancer):
+    """Power of two choices over a peak-sensitive latency estimate (as in Finagle)
+    
+    Each server's cost is its exponentially weighted moving average latency
+    times (active connections + 1). A slow response raises the average to that
+    value at once, and it decays back over decay_time seconds, so a server
+    that gets slow is avoided quickly and retried gradually.
+    
+    A server with no samples yet starts from default_rtt (if None, the first
+    latency observed on any server) instead of 0, which would make it look
+    fastest and flood it until its first responses come back.
+    """
+    
+    def __init__(self, servers: List[Server], decay_time: float = 1.0,
+                 rng: Optional[random.Random] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 healthy: Optional[HealthyServerSet] = None,
+                 default_rtt: Optional[float] = None):
+        super().__init__(servers, rng, healthy)
+        self.decay_time = decay_time
+        self.clock = clock  # simulations pass their virtual clock here
+        self.default_rtt = default_rtt
+        self.ewma: Dict[int, float] = {}  # only servers with a sample
+        self.last_update: Dict[int, float] = {server.id: clock() for server in servers}
+    
+    def record_latency(self, server: Server, latency: float):
+        """Feed an observed request duration into the server's average"""
+        now = self.clock()
+        elapsed = now - self.last_update[server.id]
+        self.last_update[server.id] = now
+        if self.default_rtt is None:
+            self.default_rtt = latency
+        
+        current = self.ewma.get(server.id, self.default_rtt)
+        if latency > current:
+            self.ewma[server.id] = latency  # peak: jump up immediately
+        else:
+            weight = math.exp(-elapsed / self.decay_time)
+            self.ewma[server.id] = current * weight + latency * (1 - weight)
+    
+    def cost(self, server: Server) -> float:
+        rtt = self.ewma.get(server.id, self.default_rtt or 0.0)
+        return rtt * (server.active_connections + 1)
+
+class SmoothWeightedRoundRobinBalancer:
+    """Weighted round robin that interleaves picks (nginx's smooth algorithm)
+    
+    With weights 5:1:1 the order is A A B A C A A rather than A A A A A B C.
+    """
+    
+    def __init__(self, servers: List[Server], weights: Dict[int, int],
+                 healthy: Optional[HealthyServerSet] = None):
+        self.servers = servers
+        self.weights = weights
+        self._owns_healthy = healthy is None
+        self.healthy = healthy or HealthyServerSet(servers)
+        self.current: Dict[int, float] = {server.id: 0 for server in servers}
+    
+    def close(self):
+        """Unsubscribe from the servers (a shared HealthyServerSet stays open)"""
+        if self._owns_healthy:
+            self.healthy.close()
+    
+    def select_server(self) -> Optional[Server]:
+        """Select the healthy server with the highest running weight"""
+        best = None
+        total = 0
+        for server in self.healthy.servers:
+            weight = self.weights.get(server.id, 1) * self.healthy.weight(server)
+            self.current[server.id] += weight
+            total += weight
+            if best is None or self.current[server.id] > self.current[best.id]:
+                best = server
+        if best is not None:
+            self.current[best.id] -= total
+        return best
+
+def ring_hash(value: str) -> int:
+    """Stable 64-bit hash (built-in hash() of a str changes between runs)"""
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], 'big')
+
+class ConsistentHashBalancer:
+    """Routes each request key to the same server so its cache stays warm
+    
+    Every healthy server owns `replicas` virtual nodes on a hash ring; a key
+    goes to the first node clockwise from its hash, found with bisect in
+    O(log n). When a server leaves, only the keys it owned move (about 1/n).
+    
+    With load_factor set, a server already holding more than load_factor
+    times the average in-flight load is passed over for the next one on the
+    ring ("consistent hashing with bounded loads"), so a hot key cannot
+    swamp its server.
+    
+    With a slow-start HealthyServerSet, a ramping server only takes back the
+    fraction of its keys given by its weight (chosen by key hash, so the same
+    keys return first); the rest still go to the next server on the ring. A
+    lock keeps the ring consistent when health changes on another thread.
+    """
+    
+    def __init__(self, servers: List[Server], replicas: int = 100,
+                 load_factor: Optional[float] = 1.25,
+                 healthy: Optional[HealthyServerSet] = None):
+        self.healthy = healthy
+        self._lock = threading.RLock()
+        self.servers = {server.id: server for server in servers}
+        self.replicas = replicas
+        self.load_factor = load_factor
+        self.points: List[int] = []      # sorted virtual node hashes
+        self.owners: List[int] = []      # server id of each point
+        self.on_ring = set()
+        self.in_flight: Dict[int, int] = {}
+        self.total_in_flight = 0  # kept up to date so the bound is O(1)
+        for server in servers:
+            if server.is_healthy:
+                self._add(server)
+            server.add_listener(self._on_server_change)
+    
+    def close(self):
+        """Unsubscribe from the servers"""
+        for server in self.servers.values():
+            server.remove_listener(self._on_server_change)
+    
+    def _server_points(self, server: Server) -> List[int]:
+        return [ring_hash(f"{server.id}#{replica}") for replica in range(self.replicas)]
+    
+    def _add(self, server: Server):
+        for point in self._server_points(server):
+            index = bisect_left(self.points, point)
+            self.points.insert(index, point)
+            self.owners.insert(index, server.id)
+        self.on_ring.add(server.id)
+        self.in_flight[server.id] = server.active_connections
+        self.total_in_flight += server.active_connections
+    
+    def _remove(self, server: Server):
+        kept = [(point, owner) for point, owner in zip(self.points, self.owners)
+                if owner != server.id]
+        self.points = [point for point, _ in kept]
+        self.owners = [owner for _, owner in kept]
+        self.on_ring.discard(server.id)
+        self.total_in_flight -= self.in_flight.pop(server.id)
+    
+    def _on_server_change(self, server: Server):
+        with self._lock:
+            if server.is_healthy and server.id not in self.on_ring:
+                self._add(server)
+            elif not server.is_healthy and server.id in self.on_ring:
+                self._remove(server)
+            elif server.id in self.on_ring:
+                self.total_in_flight += server.active_connections - self.in_flight[server.id]
+                self.in_flight[server.id] = server.active_connections
+    
+    def _load_bound(self) -> float:
+        return math.ceil(self.load_factor * (self.total_in_flight + 1) / len(self.on_ring))
+    
+    def _admits(self, owner: int, key_fraction: float) -> bool:
+        """Whether a server in slow start takes this key back yet"""
+        return self.healthy is None or key_fraction < self.healthy.weight(self.servers[owner])
+    
+    def select_server(self, key: str) -> Optional[Server]:
+        """Select the server that owns key, skipping overloaded ones"""
+        with self._lock:
+            if not self.points:
+                return None
+            
+            key_hash = ring_hash(key)
+            key_fraction = (key_hash & 0xFFFF) / 0x10000
+            index = bisect_right(self.points, key_hash) % len(self.points)
+            bound = self._load_bound() if self.load_factor is not None else None
+            tried = set()
+            while len(tried) < len(self.on_ring):
+                owner = self.owners[index]
+                if owner not in tried:
+                    if ((bound is None or self.in_flight[owner] < bound)
+                            and self._admits(owner, key_fraction)):
+                        return self.servers[owner]
+                    tried.add(owner)
+                index = (index + 1) % len(self.points)
+            # Only reached when every server is ramping up: use the key's owner
+            return self.servers[self.owners[bisect_right(self.points, key_hash) % len(self.points)]]
+
+class HealthChecker:
+    """Actively probes servers on a jittered schedule and flips is_healthy
+    
+    Each server is probed every interval seconds, +/- jitter as a fraction,
+    so probes from many balancers don't arrive in lockstep. A server is marked
+    down after unhealthy_threshold failed probes in a row and up again after
+    healthy_threshold good ones. run_pending() does the work and can be driven
+    by a simulation clock; start() runs it on a background thread instead.
+    """
+    
+    def __init__(self, servers: List[Server], probe: Optional[Callable[[Server], bool]] = None,
+                 interval: float = 1.0, jitter: float = 0.2,
+                 unhealthy_threshold: int = 2, healthy_threshold: int = 2,
+                 clock: Callable[[], float] = time.monotonic,
+                 rng: Optional[random.Random] = None):
+        self.servers = {server.id: server for server in servers}
+        self.probe = probe or (lambda server: server.ping())
+        self.interval = interval
+        self.jitter = jitter
+        self.unhealthy_threshold = unhealthy_threshold
+        self.healthy_threshold = healthy_threshold
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.streaks: Dict[int, int] = {server.id: 0 for server in servers}  # +ok / -failed
+        self.marked_down = set()
+        self.events: List[Tuple[float, str, str]] = []
+        self._lock = threading.Lock()  # run_pending from the caller and start()'s thread
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        
+        # Spread first probes over one interval: (due time, server id)
+        now = clock()
+        self.schedule = [(now + self.rng.uniform(0, interval), server.id) for server in servers]
+        heapq.heapify(self.schedule)
+    
+    def _next_delay(self) -> float:
+        return self.interval * (1 + self.rng.uniform(-self.jitter, self.jitter))
+    
+    def run_pending(self) -> int:
+        """Probe every server that is due and return how many were probed"""
+        with self._lock:
+            now = self.clock()
+            probed = 0
+            while self.schedule and self.schedule[0][0] <= now:
+                _, server_id = heapq.heappop(self.schedule)
+                self._check(self.servers[server_id], now)
+                heapq.heappush(self.schedule, (now + self._next_delay(), server_id))
+                probed += 1
+            return probed
+    
+    def _check(self, server: Server, now: float):
+        try:
+            ok = self.probe(server)
+        except Exception:
+            ok = False
+        
+        streak = self.streaks[server.id]
+        if ok:
+            streak = streak + 1 if streak > 0 else 1
+        else:
+            streak = streak - 1 if streak < 0 else -1
+        self.streaks[server.id] = streak
+        
+        if server.id not in self.marked_down and streak == -self.unhealthy_threshold:
+            self.marked_down.add(server.id)
+            server.mark_down("probe")
+            self.events.append((now, server.name, "probe failed - marked down"))
+        elif server.id in self.marked_down and streak == self.healthy_threshold:
+            self.marked_down.discard(server.id)
+            server.mark_up("probe")
+            self.events.append((now, server.name, "probe passed - marked up"))
+    
+    def start(self):
+        """Probe in a daemon thread until stop() is called"""
+        def loop():
+            while not self._stop.is_set():
+                self.run_pending()
+                with self._lock:
+                    wait = self.schedule[0][0] - self.clock() if self.schedule else self.interval
+                self._stop.wait(max(0.0, wait))
+        
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+class OutlierDetector:
+    """Passive outlier ejection from the results of real requests (as in Envoy)
+    
+    A server is ejected after consecutive_failures failed requests in a row,
+    or when evaluate() finds its average latency more than latency_stddevs
+    standard deviations above the mean of the rest of the pool (and at least
+    min_latency_ratio times that mean, so ordinary noise in a tight pool is
+    left alone). Leaving the server itself out of the mean matters in small
+    pools, where one bad server drags the average and the spread up with it
+    and hides itself. Ejections last base_ejection_time
+    times the number of times the server has been ejected, and never take out
+    more than max_ejection_fraction of the pool.
+    """
+    
+    def __init__(self, servers: List[Server], consecutive_failures: int = 5,
+                 latency_stddevs: float = 2.0, min_latency_ratio: float = 2.0,
+                 min_hosts: int = 5, min_requests: int = 20,
+                 base_ejection_time: float = 30.0, max_ejection_fraction: float = 0.5,
+                 smoothing: float = 0.05, clock: Callable[[], float] = time.monotonic):
+        self.servers = servers
+        self.consecutive_failures = consecutive_failures
+        self.latency_stddevs = latency_stddevs
+        self.min_latency_ratio = min_latency_ratio
+        self.min_hosts = min_hosts
+        self.min_requests = min_requests
+        self.base_ejection_time = base_ejection_time
+        self.max_ejection_fraction = max_ejection_fraction
+        self.smoothing = smoothing
+        self.clock = clock
+        
+        self.failures: Dict[int, int] = {server.id: 0 for server in servers}
+        self.latency: Dict[int, float] = {}
+        self.samples: Dict[int, int] = {server.id: 0 for server in servers}
+        self.ejected_until: Dict[int, float] = {}
+        self.times_ejected: Dict[int, int] = {server.id: 0 for server in servers}
+        self.events: List[Tuple[float, str, str]] = []
+    
+    def record(self, server: Server, latency: float, success: bool = True):
+        """Feed in the outcome of one request"""
+        if not success:
+            self.failures[server.id] += 1
+            if self.failures[server.id] >= self.consecutive_failures:
+                self._eject(server, f"{self.failures[server.id]} consecutive failures")
+            return
+        
+        self.failures[server.id] = 0
+        self.samples[server.id] += 1
+        # Plain running mean until there are enough samples, then EWMA
+        alpha = max(self.smoothing, 1.0 / self.samples[server.id])
+        previous = self.latency.get(server.id, latency)
+        self.latency[server.id] = previous + alpha * (latency - previous)
+    
+    def _eject(self, server: Server, reason: str) -> bool:
+        if server.id in self.ejected_until:
+            return False
+        if len(self.ejected_until) + 1 > self.max_ejection_fraction * len(self.servers):
+            return False  # keep enough of the pool to serve traffic
+        
+        now = self.clock()
+        self.times_ejected[server.id] += 1
+        self.ejected_until[server.id] = now + self.base_ejection_time * self.times_ejected[server.id]
+        self.failures[server.id] = 0
+        server.mark_down("outlier")
+        self.events.append((now, server.name, f"ejected: {reason}"))
+        return True
+    
+    def evaluate(self):
+        """Return servers whose ejection expired and eject latency outliers"""
+        now = self.clock()
+        for server in self.servers:
+            if server.id in self.ejected_until and self.ejected_until[server.id] <= now:
+                del self.ejected_until[server.id]
+                self.latency.pop(server.id, None)  # start fresh, not from the bad average
+                self.samples[server.id] = 0
+                server.mark_up("outlier")
+                self.events.append((now, server.name, "returned from ejection"))
+        
+        candidates = [server for server in self.servers
+                      if server.id not in self.ejected_until
+                      and self.samples[server.id] >= self.min_requests]
+        if len(candidates) < self.min_hosts:
+            return
+        
+        # Leave-one-out mean and variance from running sums: O(n) overall
+        count = len(candidates) - 1
+        total = sum(self.latency[server.id] for server in candidates)
+        total_squares = sum(self.latency[server.id] ** 2 for server in candidates)
+        for server in candidates:
+            value = self.latency[server.id]
+            mean = (total - value) / count
+            variance = max(0.0, (total_squares - value ** 2) / count - mean ** 2)
+            threshold = max(mean + self.latency_stddevs * math.sqrt(variance),
+                            mean * self.min_latency_ratio)
+            if value > threshold:
+                self._eject(server, f"latency {value * 1000:.1f}ms vs pool {mean * 1000:.1f}ms")
+
+def exponential_service_time(mean: float = 0.01) -> Callable[[Server, random.Random], float]:
+    """Service time distribution: exponential with mean scaled by server speed"""
+    def sample(server: Server, rng: random.Random) -> float:
+        return rng.expovariate(1.0 / (mean * server.speed))
+    return sample
+
+def lognormal_service_time(median: float = 0.01, sigma: float = 1.0) -> Callable[[Server, random.Random], float]:
+    """Heavy-tailed service time distribution, median scaled by server speed"""
+    def sample(server: Server, rng: random.Random) -> float:
+        return rng.lognormvariate(math.log(median * server.speed), sigma)
+    return sample
+
+def format_duration(seconds: float) -> str:
+    """Milliseconds for short durations, seconds once an overloaded queue grows"""
+    if seconds < 1.0:
+        return f"{seconds * 1000:.1f}ms"
+    return f"{seconds:.1f}s"
+
+class EventDrivenSimulator:
+    """Discrete-event simulation with Poisson arrivals and overlapping requests
+    
+    Time is virtual, so a million requests run in seconds, and requests really
+    overlap: a server's active_connections counts every request in service or
+    queued on it at the moment the balancer makes its next pick. Each server
+    runs workers_per_server requests at once and queues the rest in FIFO order.
+    """
+    
+    ARRIVAL, COMPLETION = 0, 1
+    
+    def __init__(self, arrival_rate: float = 250.0, workers_per_server: int = 1,
+                 service_time: Optional[Callable[[Server, random.Random], float]] = None,
+                 seed: int = 42):
+        self.arrival_rate = arrival_rate
+        self.workers_per_server = workers_per_server
+        self.service_time = service_time or exponential_service_time()
+        self.seed = seed
+        self.now = 0.0
+    
+    def clock(self) -> float:
+        """Current simulated time in seconds"""
+        return self.now
+    
+    def run(self, servers: List[Server], balancer_factory: Callable[[List[Server]], object],
+            num_requests: int = 100000) -> Dict:
+        """Simulate num_requests arrivals and return latency and throughput stats
+        
+        The balancer is built by balancer_factory after the clock is reset, so
+        latency-aware balancers can take the simulator's clock, and closed at
+        the end so the same servers can be run again with another balancer.
+        """
+        rng = random.Random(self.seed)
+        self.now = 0.0
+        for server in servers:
+            server.total_requests = 0
+            server.active_connections = 0
+        balancer = balancer_factory(servers)
+        try:
+            return self._simulate(servers, balancer, rng, num_requests)
+        finally:
+            close = getattr(balancer, 'close', None)
+            if close:
+                close()
+    
+    def _simulate(self, servers: List[Server], balancer, rng: random.Random,
+                  num_requests: int) -> Dict:
+        record_latency = getattr(balancer, 'record_latency', None)
+        
+        busy = {server.id: 0 for server in servers}
+        waiting: Dict[int, deque] = {server.id: deque() for server in servers}
+        latencies = array('d')
+        queue_delays = array('d')
+        dropped = 0
+        max_queue = 0
+        
+        # Events are (time, sequence, kind, server, arrival_time); the sequence
+        # number breaks ties so servers are never compared
+        events = [(rng.expovariate(self.arrival_rate), 0, self.ARRIVAL, None, 0.0)]
+        sequence = 1
+        arrivals = 1
+        
+        while events:
+            self.now, _, kind, server, arrived_at = heapq.heappop(events)
+            
+            if kind == self.ARRIVAL:
+                # Schedule the next arrival of the Poisson process
+                if arrivals < num_requests:
+                    next_time = self.now + rng.expovariate(self.arrival_rate)
+                    heapq.heappush(events, (next_time, sequence, self.ARRIVAL, None, 0.0))
+                    sequence += 1
+                    arrivals += 1
+                
+                server = balancer.select_server()
+                if server is None:
+                    dropped += 1
+                    continue
+                server.total_requests += 1
+                server.add_connections(1)
+                
+                if busy[server.id] < self.workers_per_server:
+                    busy[server.id] += 1
+                    queue_delays.append(0.0)
+                    done = self.now + self.service_time(server, rng)
+                    heapq.heappush(events, (done, sequence, self.COMPLETION, server, self.now))
+                    sequence += 1
+                else:
+                    waiting[server.id].append(self.now)
+                    max_queue = max(max_queue, len(waiting[server.id]))
+            else:
+                latency = self.now - arrived_at
+                latencies.append(latency)
+                server.add_connections(-1)
+                if record_latency:
+                    record_latency(server, latency)
+                
+                # Hand the freed worker to the oldest queued request
+                if waiting[server.id]:
+                    queued_at = waiting[server.id].popleft()
+                    queue_delays.append(self.now - queued_at)
+                    done = self.now + self.service_time(server, rng)
+                    heapq.heappush(events, (done, sequence, self.COMPLETION, server, queued_at))
+                    sequence += 1
+                else:
+                    busy[server.id] -= 1
+        
+        ordered = sorted(latencies)
+        delays = sorted(queue_delays)
+        return {
+            'completed': len(latencies),
+            'dropped': dropped,
+            'simulated_seconds': self.now,
+            'throughput': len(latencies) / self.now if self.now else 0.0,
+            'mean_queue_delay': sum(delays) / len(delays) if delays else 0.0,
+            'p99_queue_delay': percentile(delays, 99, presorted=True),
+            'p50': percentile(ordered, 50, presorted=True),
+            'p99': percentile(ordered, 99, presorted=True),
+            'p999': percentile(ordered, 99.9, presorted=True),
+            'max_queue': max_queue,
+            'distribution': {server.name: server.total_requests for server in servers}
+        }
+
+def percentile(values: List[float], pct: float, presorted: bool = False) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not values:
+        return 0.0
+    ordered = values if presorted else sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
 class LoadBalancerSimulator:
     """Simulates and compares different load balancing algorithms"""
     
     def __init__(self):
-        # Create three servers with different names
+        # Create three servers with different names and processing speeds
         self.servers = [
-            Server(1, "FastServer"),
-            Server(2, "MediumServer"), 
-            Server(3, "SlowServer")
+            Server(1, "FastServer", speed=0.5),
+            Server(2, "MediumServer", speed=1.0), 
+            Server(3, "SlowServer", speed=3.0)
         ]
         
         # Create both algorithms
         self.round_robin = RoundRobinBalancer(self.servers)
         self.least_connections = LeastConnectionsBalancer(self.servers)
+        
+        # Strategies that account for server speed
+        self.power_of_two = PowerOfTwoChoicesBalancer(self.servers)
+        self.peak_ewma = PeakEWMABalancer(self.servers)
+        self.weighted_round_robin = SmoothWeightedRoundRobinBalancer(
+            self.servers, weights={1: 6, 2: 3, 3: 1})
     
     def simulate_requests(self, algorithm, algorithm_name: str, num_requests: int = 20):
         """Send requests through the load balancer"""
@@ -114,7 +960,7 @@ class LoadBalancerSimulator:
             if server:
                 # Simulate some servers being slower (more active connections)
                 if server.name == "SlowServer":
-                    server.active_connections += random.randint(0, 2)
+                    server.add_connections(random.randint(0, 2))
                 
                 result = server.handle_request()
                 print(f"Request {i+1:2d}: {result}")
@@ -124,6 +970,244 @@ class LoadBalancerSimulator:
         # Show final distribution
         self.show_distribution(algorithm_name)
     
+    def measure_latency(self, algorithm, num_requests: int = 300,
+                        concurrency: int = 8) -> List[float]:
+        """Send requests from concurrency client threads; return each one's duration
+        
+        Requests overlap, so active_connections reflects real load when the
+        balancer picks. Each server works on one request at a time and the
+        rest wait their turn, so the latency includes that queueing.
+        """
+        
+        for server in self.servers:
+            server.total_requests = 0
+            server.active_connections = 0
+        
+        workers = {server.id: threading.Lock() for server in self.servers}
+        # Picks are made one at a time, like a proxy's event loop; the count
+        # is raised before the lock is released so the next pick sees it
+        pick_lock = threading.Lock()
+        issued = [0]
+        latencies = []
+        record_latency = getattr(algorithm, 'record_latency', None)
+        
+        def client():
+            while True:
+                with pick_lock:
+                    if issued[0] == num_requests:
+                        return
+                    issued[0] += 1
+                    server = algorithm.select_server()
+                    if server is None:
+                        continue
+                    server.add_connections(1)
+                    server.total_requests += 1
+                
+                start_time = time.perf_counter()
+                with workers[server.id]:
+                    server.process()
+                latency = time.perf_counter() - start_time
+                server.add_connections(-1)
+                
+                with pick_lock:
+                    latencies.append(latency)
+                    # Latency-aware strategies learn from what they observe
+                    if record_latency:
+                        record_latency(server, latency)
+        
+        clients = [threading.Thread(target=client) for _ in range(concurrency)]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        
+        return latencies
+    
+    def compare_latency_percentiles(self, num_requests: int = 300, concurrency: int = 8):
+        """Report p50/p95/p99 latency for each strategy on mixed-speed servers"""
+        
+        print(f"\nLATENCY BY STRATEGY ({num_requests} requests from {concurrency} concurrent "
+              f"clients, heterogeneous servers)")
+        print("=" * 60)
+        
+        strategies = {
+            'Round Robin': self.round_robin,
+            'Least Connections': self.least_connections,
+            'Power of Two': self.power_of_two,
+            'Peak EWMA': self.peak_ewma,
+            'Smooth Weighted RR': self.weighted_round_robin
+        }
+        
+        print(f"{'Strategy':<20}{'p50':>9}{'p95':>9}{'p99':>9}   Requests per server")
+        print("-" * 70)
+        results = {}
+        for name, algorithm in strategies.items():
+            latencies = self.measure_latency(algorithm, num_requests, concurrency)
+            results[name] = {pct: percentile(latencies, pct) * 1000 for pct in (50, 95, 99)}
+            distribution = "/".join(str(server.total_requests) for server in self.servers)
+            print(f"{name:<20}{results[name][50]:>7.2f}ms{results[name][95]:>7.2f}ms"
+                  f"{results[name][99]:>7.2f}ms   {distribution}")
+        
+        return results
+    
+    def simulate_health_management(self, num_servers: int = 8, duration: float = 120.0,
+                                   request_rate: float = 200.0):
+        """Crash one server and slow down another; watch them get pulled and return
+        
+        Runs on a virtual clock: the health checker probes on its jittered
+        schedule, the outlier detector sees every request's latency, and the
+        balancer only ever picks from the healthy set.
+        """
+        
+        print(f"\nHEALTH CHECKING AND OUTLIER EJECTION ({num_servers} servers, {duration:.0f}s)")
+        print("=" * 60)
+        
+        clock_time = [0.0]
+        clock = lambda: clock_time[0]
+        rng = random.Random(3)
+        servers = [Server(i, f"server-{i}") for i in range(1, num_servers + 1)]
+        healthy = HealthyServerSet(servers, slow_start=10.0, clock=clock)
+        balancer = PowerOfTwoChoicesBalancer(servers, random.Random(5), healthy=healthy)
+        checker = HealthChecker(servers, interval=2.0, jitter=0.2, clock=clock, rng=rng)
+        detector = OutlierDetector(servers, base_ejection_time=30.0, clock=clock)
+        
+        crashed, degraded = servers[1], servers[2]
+        picks = {server.id: 0 for server in servers}
+        step = 1.0 / request_rate
+        requests_sent = 0
+        while clock_time[0] < duration:
+            now = clock_time[0]
+            if now >= 20.0 and crashed.responding and now < 50.0:
+                crashed.responding = False
+            elif now >= 50.0 and not crashed.responding:
+                crashed.responding = True
+            degraded.speed = 10.0 if 30.0 <= now < 45.0 else 1.0
+            
+            checker.run_pending()
+            server = balancer.select_server()
+            if server is not None:
+                picks[server.id] += 1
+                latency = rng.expovariate(1.0 / (0.01 * server.speed))
+                detector.record(server, latency, success=server.responding)
+            requests_sent += 1
+            if requests_sent % int(request_rate) == 0:
+                detector.evaluate()  # once per simulated second
+            clock_time[0] = now + step
+        
+        for when, name, message in sorted(checker.events + detector.events):
+            print(f"  t={when:6.1f}s  {name:<10} {message}")
+        print(f"Requests per server: {'/'.join(str(count) for count in picks.values())}")
+        return picks
+    
+    def compare_cache_affinity(self, num_servers: int = 5, cache_capacity: int = 30,
+                               num_users: int = 200, num_requests: int = 20000):
+        """Per-server LRU hit ratio under round robin vs consistent hashing
+        
+        Each server runs the lesson09 LRUCache. Round robin sends every user
+        to every server, so each cache has to hold the whole hot set; with
+        consistent hashing each server only sees its own share of users.
+        """
+        
+        lesson09_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+        if lesson09_dir not in sys.path:
+            sys.path.insert(0, lesson09_dir)
+        from assignment_cache import LRUCache
+        
+        print(f"\nCACHE AFFINITY ({num_servers} servers x {cache_capacity}-entry LRU, "
+              f"{num_users} users, {num_requests:,} requests)")
+        print("=" * 60)
+        
+        # 80% of requests go to 20% of users, like the lesson09 benchmark
+        rng = random.Random(11)
+        popular = num_users // 5
+        requests = [f"user_{rng.randrange(popular)}" if rng.random() < 0.8
+                    else f"user_{rng.randrange(popular, num_users)}"
+                    for _ in range(num_requests)]
+        
+        strategies = {
+            'Round Robin': lambda servers: RoundRobinBalancer(servers),
+            'Consistent Hash': lambda servers: ConsistentHashBalancer(servers)
+        }
+        
+        results = {}
+        for name, factory in strategies.items():
+            servers = [Server(i, f"server-{i}") for i in range(1, num_servers + 1)]
+            caches = {server.id: LRUCache(cache_capacity) for server in servers}
+            balancer = factory(servers)
+            
+            for key in requests:
+                server = (balancer.select_server(key) if isinstance(balancer, ConsistentHashBalancer)
+                          else balancer.select_server())
+                cache = caches[server.id]
+                if cache.get(key) is None:
+                    cache.put(key, {"id": key})
+            
+            ratios = [caches[server.id].hit_ratio() for server in servers]  # percentages
+            total_hits = sum(cache.hits for cache in caches.values())
+            results[name] = total_hits / num_requests
+            per_server = " ".join(f"{ratio:.0f}%" for ratio in ratios)
+            print(f"{name:<16} overall {results[name]:6.1%}   per server: {per_server}")
+        
+        # How many keys change servers when one server fails
+        servers = [Server(i, f"server-{i}") for i in range(1, num_servers + 1)]
+        balancer = ConsistentHashBalancer(servers, load_factor=None)
+        keys = [f"user_{i}" for i in range(10000)]
+        before = {key: balancer.select_server(key).id for key in keys}
+        servers[0].is_healthy = False
+        after = {key: balancer.select_server(key).id for key in keys}
+        moved = sum(1 for key in keys if before[key] != after[key])
+        print(f"Keys moved when 1 of {num_servers} servers failed: {moved / len(keys):.1%} "
+              f"(ideal {1 / num_servers:.1%}, all from the failed server: "
+              f"{all(before[key] == servers[0].id for key in keys if before[key] != after[key])})")
+        
+        return results
+    
+    def run_event_driven_comparison(self, num_requests: int = 100000,
+                                    arrival_rate: float = 250.0):
+        """Compare strategies under Poisson load with truly concurrent requests
+        
+        Unlike simulate_requests, nothing here is sequential: slow servers
+        build up real in-flight connections instead of random extra ones.
+        """
+        
+        simulator = EventDrivenSimulator(arrival_rate=arrival_rate)
+        speeds = {server.name: server.speed for server in self.servers}
+        capacity = sum(1.0 / (0.01 * speed) for speed in speeds.values())
+        
+        print(f"\nEVENT-DRIVEN SIMULATION ({num_requests:,} requests, "
+              f"{arrival_rate:.0f} req/s arriving, capacity {capacity:.0f} req/s)")
+        print("=" * 60)
+        
+        strategies = {
+            'Round Robin': RoundRobinBalancer,
+            'Least Connections': LeastConnectionsBalancer,
+            'Power of Two': lambda servers: PowerOfTwoChoicesBalancer(servers, random.Random(7)),
+            'Peak EWMA': lambda servers: PeakEWMABalancer(
+                servers, decay_time=0.1, rng=random.Random(7), clock=simulator.clock),
+            'Smooth Weighted RR': lambda servers: SmoothWeightedRoundRobinBalancer(
+                servers, weights={1: 6, 2: 3, 3: 1})
+        }
+        
+        print(f"{'Strategy':<20}{'req/s':>8}{'queue':>10}{'p50':>10}{'p99':>10}"
+              f"{'p99.9':>10}   Requests per server")
+        print("-" * 90)
+        results = {}
+        for name, factory in strategies.items():
+            start_time = time.perf_counter()
+            stats = simulator.run(self.servers, factory, num_requests)
+            stats['wall_seconds'] = time.perf_counter() - start_time
+            results[name] = stats
+            
+            distribution = "/".join(str(count) for count in stats['distribution'].values())
+            print(f"{name:<20}{stats['throughput']:>8.0f}"
+                  f"{format_duration(stats['mean_queue_delay']):>10}"
+                  f"{format_duration(stats['p50']):>10}{format_duration(stats['p99']):>10}"
+                  f"{format_duration(stats['p999']):>10}   {distribution}")
+        
+        total_wall = sum(stats['wall_seconds'] for stats in results.values())
+        print(f"\nSimulated {num_requests * len(strategies):,} requests in {total_wall:.1f}s wall time")
+        return results
+    
     def show_distribution(self, algorithm_name: str):
         """Show how requests were distributed across servers"""
         
@@ -171,6 +1255,18 @@ class LoadBalancerSimulator:
         # Test failure scenario
         self.simulate_failure_scenario()
         
+        # Compare tail latency when servers run at different speeds
+        self.compare_latency_percentiles()
+        
+        # Same strategies with overlapping requests under Poisson load
+        self.run_event_driven_comparison()
+        
+        # Automatic failure detection instead of calling fail()/recover()
+        self.simulate_health_management()
+        
+        # Key affinity keeps each user's cache entry on one server
+        self.compare_cache_affinity()
+        
         # Summary
         print(f"\nKEY INSIGHTS:")
         print("- Round Robin distributes requests evenly across healthy servers")
@@ -178,6 +1274,44 @@ class LoadBalancerSimulator:
         print("- Both algorithms handle server failures by skipping failed servers")
         print("- Choice depends on whether your servers have similar performance")
 
+def benchmark_least_connections(sizes: Optional[List[int]] = None, num_picks: int = 2000):
+    """Time least-connections picks for growing server pools"""
+    
+    sizes = sizes or [10, 100, 1000, 10000]
+    
+    print(f"\nLEAST CONNECTIONS PICK COST ({num_picks:,} picks)")
+    print("=" * 60)
+    print(f"{'Servers':>8}{'Scan (us/pick)':>18}{'Heap (us/pick)':>18}{'Speedup':>10}")
+    print("-" * 54)
+    
+    results = []
+    for size in sizes:
+        timings = {}
+        for name, balancer_class in (('scan', ScanLeastConnectionsBalancer),
+                                     ('heap', LeastConnectionsBalancer)):
+            servers = [Server(i, f"Server{i}") for i in range(size)]
+            balancer = balancer_class(servers)
+            busy = []
+            rng = random.Random(1)
+            
+            start_time = time.perf_counter()
+            for _ in range(num_picks):
+                # Open a connection on the chosen server and close a random one,
+                # keeping roughly size connections in flight
+                server = balancer.select_server()
+                server.add_connections(1)
+                busy.append(server)
+                if len(busy) > size:
+                    done = busy.pop(rng.randrange(len(busy)))
+                    done.add_connections(-1)
+            timings[name] = (time.perf_counter() - start_time) / num_picks * 1_000_000
+        
+        results.append((size, timings['scan'], timings['heap']))
+        print(f"{size:>8}{timings['scan']:>18.2f}{timings['heap']:>18.2f}"
+              f"{timings['scan'] / timings['heap']:>9.1f}x")
+    
+    return results
+
 def main():
     """Run the load balancer simulation"""
     
@@ -188,6 +1322,9 @@ def main():
     simulator = LoadBalancerSimulator()
     simulator.run_comparison()
     
+    # Show how pick cost scales with the number of backends
+    benchmark_least_connections()
+    
     print(f"\nLab Complete! Discuss the results with your classmates.")
 
 if __name__ == "__main__":
@@ -0,0 +1,370 @@
+# lab_reverse_proxy.py
+"""
+Reverse proxy lab: the load balancer strategies in front of real servers
+
+An asyncio TCP proxy listens on a port and forwards length-prefixed
+JSON-RPC frames to backend processes running the lesson03 RPCServer.
+Upstream connections are kept alive in a pool per backend, so a request
+normally costs no new TCP handshake to the backend. Any balancer from lab_load_balancer_solution can
+pick the backend; its Server objects track in-flight requests so least
+connections and power-of-two see the real load.
+
+Run `python lab_reverse_proxy.py` for the overhead benchmark, or
+`python lab_reverse_proxy.py serve` to start a proxy on port 9000.
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from lab_load_balancer_solution import (
+    ConsistentHashBalancer, LeastConnectionsBalancer, PowerOfTwoChoicesBalancer,
+    RoundRobinBalancer, Server, percentile
+)
+
+RPC_SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              '..', '..', 'lesson03', 'homework_2_solution')
+if RPC_SERVER_DIR not in sys.path:
+    sys.path.insert(0, RPC_SERVER_DIR)
+from rpc_codecs import NEGOTIATE_METHOD
+from rpc_framing import HEADER, MAX_FRAME_SIZE, FrameError, encode_frame
+
+STRATEGIES: Dict[str, Callable[[List[Server]], object]] = {
+    'round_robin': RoundRobinBalancer,
+    'least_connections': LeastConnectionsBalancer,
+    'power_of_two': PowerOfTwoChoicesBalancer,
+    'consistent_hash': ConsistentHashBalancer,
+}
+
+async def read_frame(reader: asyncio.StreamReader) -> bytes:
+    """Read one whole frame, length prefix included; b'' at end of stream
+
+    Raises FrameError for a length over MAX_FRAME_SIZE instead of trying
+    to buffer it.
+    """
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError:
+        return b''
+    (length,) = HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise FrameError(f"Frame of {length} bytes exceeds {MAX_FRAME_SIZE}")
+    return header + await reader.readexactly(length)
+
+def error_frame(message: str, request_id=None) -> bytes:
+    return encode_frame(json.dumps({"jsonrpc": "2.0", "error": message,
+                                    "id": request_id}).encode('utf-8'))
+
+def parse_request(frame: bytes):
+    """Decode the JSON message in a frame; None if it isn't valid JSON"""
+    try:
+        return json.loads(frame[HEADER.size:].decode('utf-8'))
+    except ValueError:
+        return None
+
+def expects_reply(message) -> bool:
+    """False for a notification or a batch of only notifications
+    
+    The backend answers everything else, including malformed requests.
+    """
+    if isinstance(message, dict):
+        return "id" in message
+    if isinstance(message, list) and message:
+        return not all(isinstance(item, dict) and "id" not in item for item in message)
+    return True
+
+def free_port() -> int:
+    """Ask the OS for a port nobody is listening on"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('localhost', 0))
+        return sock.getsockname()[1]
+
+def run_backend(port: int):
+    """Process target: run one lesson03 RPCServer quietly"""
+    from rpc_server import RPCServer
+
+    sys.stdout = open(os.devnull, 'w')  # it prints every new connection
+    RPCServer(port=port).start()
+
+def start_backends(count: int) -> Tuple[List[multiprocessing.Process], List[int]]:
+    """Start count backend processes and wait until they accept connections"""
+    ports = [free_port() for _ in range(count)]
+    processes = [multiprocessing.Process(target=run_backend, args=(port,), daemon=True)
+                 for port in ports]
+    for process in processes:
+        process.start()
+
+    for port in ports:
+        deadline = time.time() + 10
+        while True:
+            try:
+                socket.create_connection(('localhost', port), timeout=1).close()
+                break
+            except OSError:
+                if time.time() > deadline:
+                    raise RuntimeError(f"Backend on port {port} did not start")
+                time.sleep(0.05)
+    return processes, ports
+
+def stop_backends(processes: List[multiprocessing.Process]):
+    for process in processes:
+        process.terminate()
+        process.join()
+
+class UpstreamPool:
+    """Idle keep-alive connections to one backend"""
+
+    def __init__(self, host: str, port: int, max_idle: int = 32):
+        self.host = host
+        self.port = port
+        self.max_idle = max_idle
+        self.idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self.opened = 0
+        self.reused = 0
+
+    async def acquire(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        while self.idle:
+            reader, writer = self.idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                self.reused += 1
+                return reader, writer
+        self.opened += 1
+        return await asyncio.open_connection(self.host, self.port)
+
+    def release(self, connection: Tuple[asyncio.StreamReader, asyncio.StreamWriter]):
+        if len(self.idle) < self.max_idle and not connection[1].is_closing():
+            self.idle.append(connection)
+        else:
+            connection[1].close()
+
+    def discard(self, connection: Tuple[asyncio.StreamReader, asyncio.StreamWriter]):
+        connection[1].close()
+
+    def close(self):
+        for _, writer in self.idle:
+            writer.close()
+        self.idle.clear()
+
+class ReverseProxy:
+    """Forwards each request to a backend chosen by a pluggable balancer
+
+    Balancing is per request, not per client connection: a client holding one
+    connection open still has its requests spread over the backends. Requests
+    pipelined on one connection are forwarded concurrently (up to max_pending
+    at a time) and answered as they complete, so clients match replies by id.
+    """
+
+    def __init__(self, backend_ports: List[int], strategy: str = 'least_connections',
+                 host: str = 'localhost', port: int = 0, max_idle: int = 32,
+                 max_pending: int = 64):
+        self.host = host
+        self.port = port
+        self.max_pending = max_pending
+        self.servers = [Server(i, f"backend-{backend_port}")
+                        for i, backend_port in enumerate(backend_ports)]
+        self.balancer = STRATEGIES[strategy](self.servers)
+        self.pools = {server.id: UpstreamPool('localhost', backend_port, max_idle)
+                      for server, backend_port in zip(self.servers, backend_ports)}
+        self.server: Optional[asyncio.base_events.Server] = None
+        self.requests = 0
+        self.errors = 0
+
+    async def start(self) -> int:
+        """Start listening and return the bound port"""
+        self.server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        for pool in self.pools.values():
+            pool.close()
+
+    def _select(self, peer: str) -> Optional[Server]:
+        if isinstance(self.balancer, ConsistentHashBalancer):
+            return self.balancer.select_server(peer)  # keep a client on one backend
+        return self.balancer.select_server()
+
+    async def _respond(self, request: bytes, peer: str, writer: asyncio.StreamWriter,
+                       pending: asyncio.Semaphore):
+        try:
+            response = await self._forward(request, peer)
+            if response is not None and not writer.is_closing():
+                writer.write(response)  # one whole frame, so replies never interleave
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            pending.release()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # Hash on the host only: the port changes with every connection
+        peer = writer.get_extra_info('peername')[0]
+        pending = asyncio.Semaphore(self.max_pending)
+        tasks = set()
+        try:
+            while True:
+                await pending.acquire()  # backpressure: stop reading when too far ahead
+                try:
+                    request = await read_frame(reader)
+                except (ConnectionError, asyncio.IncompleteReadError, FrameError):
+                    request = b''
+                if not request:
+                    pending.release()
+                    break
+                task = asyncio.create_task(self._respond(request, peer, writer, pending))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def _forward(self, request: bytes, peer: str) -> Optional[bytes]:
+        """Send one request to a backend; returns its reply, or None if none is due"""
+        message = parse_request(request)
+        wants_reply = expects_reply(message)
+        if isinstance(message, dict) and message.get("method") == NEGOTIATE_METHOD:
+            # Negotiating would switch the codec of one pooled upstream
+            # connection while this client's later requests use others, so
+            # answer here: "not found" keeps the client on JSON
+            return error_frame(f"Method '{NEGOTIATE_METHOD}' not found",
+                               message.get("id")) if wants_reply else None
+        
+        server = self._select(peer)
+        if server is None:
+            self.errors += 1
+            return error_frame("No healthy backends") if wants_reply else None
+
+        pool = self.pools[server.id]
+        server.add_connections(1)
+        server.total_requests += 1
+        self.requests += 1
+        connection = None
+        try:
+            connection = await pool.acquire()
+            connection[1].write(request)
+            await connection[1].drain()
+            if not wants_reply:
+                pool.release(connection)
+                return None
+            response = await read_frame(connection[0])
+            if not response:
+                raise ConnectionError("backend closed the connection")
+            pool.release(connection)
+            return response
+        except (OSError, asyncio.IncompleteReadError, FrameError) as e:
+            if connection:
+                pool.discard(connection)
+            self.errors += 1
+            return error_frame(f"Backend unavailable: {e}") if wants_reply else None
+        finally:
+            server.add_connections(-1)
+
+async def request_loop(port: int, num_requests: int) -> List[float]:
+    """One client on a kept-alive connection, sending requests back to back"""
+    reader, writer = await asyncio.open_connection('localhost', port)
+    latencies = []
+    try:
+        for i in range(num_requests):
+            payload = encode_frame(
+                b'{"jsonrpc": "2.0", "method": "add", "params": [%d, 1], "id": %d}' % (i, i))
+            start_time = time.perf_counter()
+            writer.write(payload)
+            await writer.drain()
+            await read_frame(reader)
+            latencies.append(time.perf_counter() - start_time)
+    finally:
+        writer.close()
+    return latencies
+
+async def connect_loop(port: int, duration: float) -> int:
+    """Open a connection, make one request, close; repeat until duration passes"""
+    deadline = time.perf_counter() + duration
+    completed = 0
+    while time.perf_counter() < deadline:
+        reader, writer = await asyncio.open_connection('localhost', port)
+        writer.write(encode_frame(b'{"jsonrpc": "2.0", "method": "add", "params": [1, 1], "id": 1}'))
+        await writer.drain()
+        await read_frame(reader)
+        writer.close()
+        await writer.wait_closed()
+        completed += 1
+    return completed
+
+async def generate_load(port: int, clients: int = 20, requests_per_client: int = 200,
+                        connect_clients: int = 10, connect_duration: float = 2.0) -> Dict:
+    """Bundled load generator: latency percentiles and new connections per second"""
+    results = await asyncio.gather(*(request_loop(port, requests_per_client)
+                                     for _ in range(clients)))
+    latencies = [latency for client in results for latency in client]
+
+    counts = await asyncio.gather(*(connect_loop(port, connect_duration)
+                                    for _ in range(connect_clients)))
+    return {
+        'p50': percentile(latencies, 50),
+        'p99': percentile(latencies, 99),
+        'connections_per_second': sum(counts) / connect_duration
+    }
+
+async def measure_proxy_overhead(num_backends: int = 3, strategy: str = 'least_connections'):
+    """Compare the load generator against one backend directly and via the proxy"""
+
+    print(f"\nREVERSE PROXY OVERHEAD ({num_backends} RPCServer backends, {strategy})")
+    print("=" * 60)
+
+    processes, ports = start_backends(num_backends)
+    proxy = ReverseProxy(ports, strategy)
+    try:
+        proxy_port = await proxy.start()
+        direct = await generate_load(ports[0])
+        proxied = await generate_load(proxy_port)
+    finally:
+        await proxy.stop()
+        stop_backends(processes)
+
+    print(f"{'Path':<10}{'p50':>10}{'p99':>10}{'conn/s':>10}")
+    print("-" * 40)
+    for name, stats in (('Direct', direct), ('Proxied', proxied)):
+        print(f"{name:<10}{stats['p50'] * 1000:>8.2f}ms{stats['p99'] * 1000:>8.2f}ms"
+              f"{stats['connections_per_second']:>10.0f}")
+
+    print(f"\nAdded p99 latency: {(proxied['p99'] - direct['p99']) * 1000:.2f}ms")
+    print(f"Requests per backend: {'/'.join(str(s.total_requests) for s in proxy.servers)}")
+    reused = sum(pool.reused for pool in proxy.pools.values())
+    opened = sum(pool.opened for pool in proxy.pools.values())
+    print(f"Upstream connections opened: {opened}, reused from pool: {reused}")
+    print(f"Proxy errors: {proxy.errors}")
+    return direct, proxied
+
+async def serve(port: int = 9000, num_backends: int = 3, strategy: str = 'least_connections'):
+    """Run the proxy in front of fresh backends until interrupted"""
+    processes, ports = start_backends(num_backends)
+    proxy = ReverseProxy(ports, strategy, port=port)
+    try:
+        await proxy.start()
+        print(f"Proxy on localhost:{proxy.port} -> backends {ports} ({strategy})")
+        await asyncio.Event().wait()
+    finally:
+        await proxy.stop()
+        stop_backends(processes)
+
+def main():
+    if sys.argv[1:2] == ['serve']:
+        try:
+            asyncio.run(serve())
+        except KeyboardInterrupt:
+            print("\nProxy shutting down...")
+    else:
+        asyncio.run(measure_proxy_overhead())
+
+if __name__ == "__main__":
+    main()